@@ -1,8 +1,4 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import io
 import os
 import sys
 
@@ -10,15 +6,26 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from filters import (
-    apply_gaussian_blur, apply_edge_detection, apply_threshold,
-    apply_intensity_transform, apply_frequency_filter, 
-    apply_noise_reduction, apply_morphological_operation,
-    apply_watershed_segmentation, apply_kmeans_segmentation
+    apply_watershed_segmentation
 )
 
 # Import language support and utilities
 from languages import get_text
-from utils import initialize_session_state, change_language, restore_state, get_localized_filter_categories
+from utils import (initialize_session_state, change_language, restore_state, get_localized_filter_categories,
+                   create_download_button)
+from codec_registry import available
+from result_cache import cached_call, image_digest
+from image_store import store_upload, get_image
+from workers import JobSlot, StaleJob
+from frequency import frequency_filter, PROFILES
+from gaussian import gaussian_blur
+from tiles import tiled_filter
+from kmeans import kmeans_segmentation
+from pointwise import intensity_transform, binary_threshold
+from thresholding import threshold_image
+from bilateral import bilateral_grid, DEFAULT_SAMPLING, SAMPLING_RANGE
+from guided import guided_filter, auto_subsample, SUBSAMPLE_RANGE
+from edges import edge_detection
 
 # Configure Streamlit page
 st.set_page_config(
@@ -148,15 +155,9 @@ def show_language_selector():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def load_image(uploaded_file):
-    """Görüntü yükleme fonksiyonu"""
-    if uploaded_file is not None:
-        image = Image.open(uploaded_file)
-        # RGBA görüntüleri RGB'ye çevir
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-        return image
-    return None
+def load_image(image_key):
+    """Görüntü yükleme fonksiyonu - oturum deposundan çözülmüş görüntüyü al"""
+    return get_image(image_key)
 
 def show_image_stats(image):
     """Görüntü istatistiklerini göster"""
@@ -167,16 +168,14 @@ def show_image_stats(image):
     width, height = image.size
     mode = image.mode
     
-    # İstatistikler
-    img_array = np.array(image)
+    # İstatistikler - görüntü başına bir kez hesaplanan histogramlardan
+    histograms = image.histograms
+    means = histograms.mean()
+    stds = histograms.std()
     
-    if len(img_array.shape) == 3:  # Renkli görüntü
-        mean_r = np.mean(img_array[:, :, 0])
-        mean_g = np.mean(img_array[:, :, 1])
-        mean_b = np.mean(img_array[:, :, 2])
-        std_r = np.std(img_array[:, :, 0])
-        std_g = np.std(img_array[:, :, 1])
-        std_b = np.std(img_array[:, :, 2])
+    if histograms.is_color:  # Renkli görüntü
+        mean_r, mean_g, mean_b = means
+        std_r, std_g, std_b = stds
         
         st.markdown('<div class="metric-box">', unsafe_allow_html=True)
         st.write(f"**Boyut:** {width} × {height}")
@@ -185,8 +184,8 @@ def show_image_stats(image):
         st.write(f"**Standart Sapma:** ({std_r:.1f}, {std_g:.1f}, {std_b:.1f})")
         st.markdown('</div>', unsafe_allow_html=True)
     else:  # Gri tonlama
-        mean_val = np.mean(img_array)
-        std_val = np.std(img_array)
+        mean_val = means[0]
+        std_val = stds[0]
         
         st.markdown('<div class="metric-box">', unsafe_allow_html=True)
         st.write(f"**Boyut:** {width} × {height}")
@@ -233,6 +232,51 @@ def compare_images(original, processed):
         st.image(processed, caption=get_text('processed_image', st.session_state.language), use_column_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
+def run_filter(filter_name, func, image, *args, **kwargs):
+    """Filtreyi arka plan havuzunda çalıştır; beklerken son sonucu göster"""
+    if 'filter_jobs' not in st.session_state:
+        st.session_state.filter_jobs = JobSlot()
+    slot = st.session_state.filter_jobs
+    
+    generation, future = slot.submit(cached_call, filter_name, func, image, *args, **kwargs)
+    # İşin kaynağı kaydedilir: rerun kesilse de sonuç sonraki rerun'da doğru görüntüye bağlanır
+    st.session_state.job_sources[generation] = kwargs.get('digest')
+    
+    # Yeni sonuç gelene kadar son tamamlanan sonucu göster
+    placeholder = st.empty()
+    if slot.last_result is not None:
+        placeholder.image(slot.last_result, caption=get_text('processing', st.session_state.language), use_column_width=True)
+    status = st.empty()
+    
+    try:
+        # Her yoklamada bir st çağrısı yapılır; Streamlit yeni bir rerun
+        # isterse betik burada kesilir ve bu iş bayat kalır
+        result = slot.wait(future, on_poll=lambda: status.caption(get_text('processing', st.session_state.language)))
+    except StaleJob:
+        result = None
+    placeholder.empty()
+    status.empty()
+    return result
+
+def collect_finished_result():
+    """Son tamamlanan işin sonucunu oturum durumuna al
+
+    Rerun'ı kesilen (StaleJob) ama sonradan biten işler de dahildir; sonuç
+    alanı her zaman buradan çizilir.
+    """
+    slot = st.session_state.get('filter_jobs')
+    if slot is None:
+        return
+    generation, result = slot.last()
+    if generation > st.session_state.processed_generation and result is not None:
+        st.session_state.processed_image = result
+        st.session_state.processed_key = image_digest(result)
+        st.session_state.processed_source = st.session_state.job_sources.get(generation)
+        st.session_state.processed_generation = generation
+        # Daha eski işler artık sonuç yayınlayamaz
+        st.session_state.job_sources = {job: source for job, source in st.session_state.job_sources.items()
+                                        if job > generation}
+
 def main():
     # Dil seçici
     show_language_selector()
@@ -248,14 +292,12 @@ def main():
         key="file_uploader"
     )
     
-    # Store uploaded file in session state
+    # Decode the upload once and keep only its store key in session state
     if uploaded_file is not None:
-        st.session_state.uploaded_file = uploaded_file
+        st.session_state.image_key = store_upload(uploaded_file)
+        st.session_state.image_name = uploaded_file.name
     
-    # Use stored file if available
-    current_file = uploaded_file if uploaded_file is not None else st.session_state.uploaded_file
-    
-    if current_file is None:
+    if st.session_state.image_key is None:
         st.info(get_text("upload_info", st.session_state.language))
         
         # Uygulama hakkında bilgi
@@ -268,20 +310,23 @@ def main():
         return
     
     # Görüntüyü yükle
-    image = load_image(current_file)
-    if image is None:
+    decoded = load_image(st.session_state.image_key)
+    if decoded is None:
         st.error(get_text("image_load_error", st.session_state.language))
         return
     
+    # Filtreler PIL görüntüsü bekler; çözülmüş görüntüden bir kez oluşturulur
+    image = decoded.pil
+    
     # Orijinal görüntüyü göster
     st.subheader(get_text("uploaded_image", st.session_state.language))
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        st.image(image, caption=get_text("original_image", st.session_state.language), use_column_width=True)
+        st.image(decoded.view(), caption=get_text("original_image", st.session_state.language), use_column_width=True)
     
     with col2:
-        show_image_stats(image)
+        show_image_stats(decoded)
     
     # Filtre seçimi
     st.sidebar.header(get_text("filter_selection", st.session_state.language))
@@ -333,7 +378,7 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            processed_image = apply_gaussian_blur(image, kernel_size, sigma)
+            processed_image = run_filter("gaussian_blur", gaussian_blur, decoded.view(), kernel_size, sigma, digest=decoded.digest)
     
     elif selected_filter == "edge_detection":
         method = st.selectbox(get_text("method", st.session_state.language), [get_text("sobel", st.session_state.language), get_text("canny", st.session_state.language)])
@@ -354,7 +399,9 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                processed_image = apply_edge_detection(image, "canny", threshold1, threshold2)
+                # Yumuşatma, gradyan ve NMS görüntü başına önbellekte; eşik değişimi yalnızca histerezistir
+                processed_image = run_filter("edge_detection", edge_detection, decoded.view(), "canny", threshold1, threshold2,
+                                             image_key=decoded.digest, digest=decoded.digest)
         else:
             st.markdown(f"""
             <div class="tip-box">
@@ -363,17 +410,25 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                processed_image = apply_edge_detection(image, "sobel")
+                processed_image = run_filter("edge_detection", edge_detection, decoded.view(), "sobel",
+                                             image_key=decoded.digest, digest=decoded.digest)
     
     elif selected_filter == "threshold":
+        method_keys = {get_text(key, st.session_state.language): key for key in ("binary", "otsu", "adaptive", "niblack", "sauvola")}
         col1, col2 = st.columns(2)
         with col1:
-            method = st.selectbox(get_text("method", st.session_state.language), [get_text("binary", st.session_state.language), get_text("otsu", st.session_state.language), get_text("adaptive", st.session_state.language)])
+            method = st.selectbox(get_text("method", st.session_state.language), list(method_keys))
+        method_key = method_keys[method]
         with col2:
-            threshold_value = st.slider(get_text("threshold_value", st.session_state.language), 0, 255, 127, 
-                                      disabled=(method != get_text("binary", st.session_state.language)))
+            if method_key == "otsu":
+                classes = st.slider(get_text("threshold_classes", st.session_state.language), 2, 5, 2)
+            elif method_key == "binary":
+                threshold_value = st.slider(get_text("threshold_value", st.session_state.language), 0, 255, 127)
+            else:
+                # Blok boyutu değişince önbellekteki integral görüntüler yeniden kullanılır
+                block_size = st.slider(get_text("block_size", st.session_state.language), 3, 201, 11, step=2)
         
-        threshold_effect = get_text("fixed_threshold", st.session_state.language) if method == get_text("binary", st.session_state.language) else get_text("auto_threshold", st.session_state.language) if method == get_text("otsu", st.session_state.language) else get_text("local_threshold", st.session_state.language)
+        threshold_effect = get_text("fixed_threshold", st.session_state.language) if method_key == "binary" else get_text("auto_threshold", st.session_state.language) if method_key == "otsu" else get_text("local_threshold", st.session_state.language)
         
         st.markdown(f"""
         <div class="tip-box">
@@ -382,8 +437,12 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            method_key = "binary" if method == get_text("binary", st.session_state.language) else "otsu" if method == get_text("otsu", st.session_state.language) else "adaptive"
-            processed_image = apply_threshold(image, method_key, threshold_value)
+            if method_key == "binary":
+                processed_image = run_filter("threshold", binary_threshold, decoded.view(), threshold_value, digest=decoded.digest)
+            elif method_key == "otsu":
+                processed_image = run_filter("threshold", threshold_image, decoded.view(), "otsu", classes=classes, image_key=decoded.digest, digest=decoded.digest)
+            else:
+                processed_image = run_filter("threshold", threshold_image, decoded.view(), method_key, block_size=block_size, image_key=decoded.digest, digest=decoded.digest)
     
     elif selected_filter == "intensity_transform":
         transform_type = st.selectbox(get_text("transform_type", st.session_state.language), ["log", "gamma", "linear"])
@@ -400,7 +459,7 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                processed_image = apply_intensity_transform(image, transform_type, gamma=gamma)
+                processed_image = run_filter("intensity_transform", intensity_transform, decoded.view(), transform_type, gamma=gamma, image_key=decoded.digest, digest=decoded.digest)
         else:
             effect = get_text("illuminates_dark", st.session_state.language) if transform_type == "log" else get_text("simple_contrast", st.session_state.language)
             st.markdown(f"""
@@ -410,13 +469,16 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                processed_image = apply_intensity_transform(image, transform_type)
+                processed_image = run_filter("intensity_transform", intensity_transform, decoded.view(), transform_type, image_key=decoded.digest, digest=decoded.digest)
     
     elif selected_filter == "frequency_filter":
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
             filter_type = st.selectbox(get_text("filter_type", st.session_state.language), ["lowpass", "highpass", "bandpass"])
         with col2:
+            profile = st.selectbox(get_text("filter_profile", st.session_state.language), list(PROFILES),
+                                   format_func=lambda x: get_text(x, st.session_state.language))
+        with col3:
             cutoff = st.slider(get_text("cutoff", st.session_state.language), 1, 100, 30)
         
         effect = {
@@ -432,19 +494,25 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            processed_image = apply_frequency_filter(image, filter_type, cutoff)
+            # Spektrum görüntü başına bir kez hesaplanır; kesim değişimi yalnızca maske çarpımıdır
+            processed_image = run_filter("frequency_filter", frequency_filter, decoded.view(), filter_type, cutoff, profile,
+                                         image_key=decoded.digest, digest=decoded.digest)
     
     elif selected_filter == "noise_reduction":
-        method = st.selectbox(get_text("method", st.session_state.language), [get_text("bilateral", st.session_state.language), get_text("median", st.session_state.language), get_text("gaussian", st.session_state.language)])
+        method = st.selectbox(get_text("method", st.session_state.language), [get_text("bilateral", st.session_state.language), get_text("bilateral_grid", st.session_state.language), get_text("guided_filter", st.session_state.language), get_text("median", st.session_state.language), get_text("gaussian", st.session_state.language)])
         
-        if method == get_text("bilateral", st.session_state.language):
+        if method in (get_text("bilateral", st.session_state.language), get_text("bilateral_grid", st.session_state.language)):
+            use_grid = method == get_text("bilateral_grid", st.session_state.language)
             col1, col2, col3 = st.columns(3)
             with col1:
-                d = st.slider(get_text("neighborhood_diameter", st.session_state.language), 5, 15, 9)
+                # Izgara maliyeti çapa bağlı değil; daha büyük komşuluklar açık
+                d = st.slider(get_text("neighborhood_diameter", st.session_state.language), 5, 51 if use_grid else 15, 9)
             with col2:
                 sigma_color = st.slider(get_text("color_sigma", st.session_state.language), 10, 150, 75)
             with col3:
                 sigma_space = st.slider(get_text("space_sigma", st.session_state.language), 10, 150, 75)
+            if use_grid:
+                sampling = st.slider(get_text("grid_quality", st.session_state.language), *SAMPLING_RANGE, DEFAULT_SAMPLING, step=0.5)
             
             st.markdown(f"""
             <div class="tip-box">
@@ -453,10 +521,36 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                processed_image = apply_noise_reduction(image, "bilateral", d=d, 
-                                                     sigma_color=sigma_color, sigma_space=sigma_space)
+                if use_grid:
+                    processed_image = run_filter("noise_reduction", bilateral_grid, decoded.view(), d, sigma_color,
+                                                 sigma_space, sampling, digest=decoded.digest)
+                else:
+                    processed_image = run_filter("noise_reduction", tiled_filter, decoded.view(), "bilateral", d=d,
+                                                 sigma_color=sigma_color, sigma_space=sigma_space, digest=decoded.digest)
+        elif method == get_text("guided_filter", st.session_state.language):
+            col1, col2 = st.columns(2)
+            with col1:
+                radius = st.slider(get_text("guided_radius", st.session_state.language), 1, 64, 8)
+                guide = st.selectbox(get_text("guide_image", st.session_state.language), ["self", "luma"],
+                                     format_func=lambda x: get_text(f"guide_{x}", st.session_state.language))
+            with col2:
+                eps = st.slider(get_text("guided_eps", st.session_state.language), 0.0001, 0.1, 0.01, step=0.0001, format="%.4f")
+                subsample = st.slider(get_text("guided_subsample", st.session_state.language), *SUBSAMPLE_RANGE, auto_subsample(radius))
+            
+            st.markdown(f"""
+            <div class="tip-box">
+                <strong>{get_text('tip', st.session_state.language)}:</strong> {get_text("guided_tip", st.session_state.language)}
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
+                # İntegral tablolar görüntü başına önbellekte; yarıçap/eps değişimi yalnızca kutu okumalarıdır
+                processed_image = run_filter("noise_reduction", guided_filter, decoded.view(), radius, eps, guide,
+                                             subsample, image_key=decoded.digest, digest=decoded.digest)
         else:
-            kernel_size = st.slider(get_text("kernel_size", st.session_state.language), 3, 15, 5, step=2)
+            # Medyan maliyeti çekirdek boyutuna bağlı değil; daha büyük çekirdekler açık
+            max_kernel = 51 if method == get_text("median", st.session_state.language) else 15
+            kernel_size = st.slider(get_text("kernel_size", st.session_state.language), 3, max_kernel, 5, step=2)
             
             effect = get_text("salt_pepper_ideal", st.session_state.language) if method == get_text("median", st.session_state.language) else get_text("general_noise", st.session_state.language)
             st.markdown(f"""
@@ -466,13 +560,18 @@ def main():
             """, unsafe_allow_html=True)
             
             if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-                method_key = "median" if method == get_text("median", st.session_state.language) else "gaussian"
-                processed_image = apply_noise_reduction(image, method_key, kernel_size=kernel_size)
+                if method == get_text("median", st.session_state.language):
+                    processed_image = run_filter("noise_reduction", tiled_filter, decoded.view(), "median",
+                                                 kernel_size=kernel_size, digest=decoded.digest)
+                else:
+                    # sigma=0: OpenCV sigmayı çekirdek boyutundan türetir
+                    processed_image = run_filter("noise_reduction", tiled_filter, decoded.view(), "gaussian_blur",
+                                                 kernel_size=kernel_size, sigma=0, digest=decoded.digest)
     
     elif selected_filter == "morphological":
         col1, col2 = st.columns(2)
         with col1:
-            operation = st.selectbox(get_text("operation", st.session_state.language), [get_text("opening", st.session_state.language), get_text("closing", st.session_state.language), get_text("erosion", st.session_state.language), get_text("dilation", st.session_state.language)])
+            operation = st.selectbox(get_text("operation", st.session_state.language), [get_text("opening", st.session_state.language), get_text("closing", st.session_state.language), get_text("erosion", st.session_state.language), get_text("dilation", st.session_state.language), get_text("morph_gradient", st.session_state.language)])
         with col2:
             kernel_size = st.slider(get_text("kernel_size", st.session_state.language), 3, 15, 5, step=2)
         
@@ -480,7 +579,8 @@ def main():
             get_text("opening", st.session_state.language): get_text("noise_cleaning", st.session_state.language),
             get_text("closing", st.session_state.language): get_text("gap_filling", st.session_state.language),
             get_text("erosion", st.session_state.language): get_text("object_shrinking", st.session_state.language),
-            get_text("dilation", st.session_state.language): get_text("object_expansion", st.session_state.language)
+            get_text("dilation", st.session_state.language): get_text("object_expansion", st.session_state.language),
+            get_text("morph_gradient", st.session_state.language): get_text("object_outline", st.session_state.language)
         }
         
         st.markdown(f"""
@@ -490,8 +590,9 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            operation_key = "opening" if operation == get_text("opening", st.session_state.language) else "closing" if operation == get_text("closing", st.session_state.language) else "erosion" if operation == get_text("erosion", st.session_state.language) else "dilation"
-            processed_image = apply_morphological_operation(image, operation_key, kernel_size)
+            operation_key = "opening" if operation == get_text("opening", st.session_state.language) else "closing" if operation == get_text("closing", st.session_state.language) else "erosion" if operation == get_text("erosion", st.session_state.language) else "dilation" if operation == get_text("dilation", st.session_state.language) else "gradient"
+            processed_image = run_filter("morphological", tiled_filter, decoded.view(), "morphological",
+                                         operation=operation_key, kernel_size=kernel_size, digest=decoded.digest)
     
     elif selected_filter == "watershed":
         st.markdown(f"""
@@ -501,7 +602,7 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            processed_image = apply_watershed_segmentation(image)
+            processed_image = run_filter("watershed", apply_watershed_segmentation, image, digest=decoded.digest)
     
     elif selected_filter == "kmeans":
         k = st.slider(get_text("k_clusters", st.session_state.language), 2, 10, 3)
@@ -515,27 +616,35 @@ def main():
         """, unsafe_allow_html=True)
         
         if st.button(get_text("apply_filter", st.session_state.language), use_container_width=True):
-            processed_image = apply_kmeans_segmentation(image, k)
+            # Renk indirgemesi ve önceki K'nin merkezleri görüntü başına önbellekte tutulur
+            processed_image = run_filter("kmeans", kmeans_segmentation, decoded.view(), k,
+                                         image_key=decoded.digest, digest=decoded.digest)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # İşlenmiş görüntüyü göster
-    if processed_image is not None:
-        st.session_state.processed_image = processed_image
+    # Son tamamlanan sonuç oturumda saklanır: kodek/kalite değişikliği gibi
+    # rerun'larda ve kesilen bir rerun'dan sonra biten işlerde de gösterilir
+    collect_finished_result()
+    
+    # İşlenmiş görüntüyü göster (yalnızca yüklü görüntüden üretildiyse)
+    processed_image = st.session_state.processed_image
+    if processed_image is not None and st.session_state.processed_source == decoded.digest:
         st.subheader(get_text("result", st.session_state.language))
-        compare_images(image, processed_image)
+        compare_images(decoded.view(), processed_image)
         
         # İndirme bağlantısı
         st.subheader(get_text("download", st.session_state.language))
-        buffer = io.BytesIO()
-        processed_image.save(buffer, format='PNG')
-        st.download_button(
-            label=get_text("download_button", st.session_state.language),
-            data=buffer.getvalue(),
-            file_name=f"processed_{current_file.name}",
-            mime="image/png",
-            use_container_width=True
-        )
+        codecs = available(processed_image)
+        col1, col2 = st.columns(2)
+        with col1:
+            codec = st.selectbox(get_text("download_format", st.session_state.language), codecs,
+                                 format_func=lambda codec: get_text(codec.name, st.session_state.language))
+        with col2:
+            quality = st.slider(get_text("quality", st.session_state.language), 10, 100, 90,
+                                key="download_quality", disabled=not codec.uses_quality)
+        create_download_button(processed_image, f"processed_{st.session_state.image_name}", codec.name,
+                               quality, label=get_text("download_button", st.session_state.language),
+                               image_key=st.session_state.processed_key)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
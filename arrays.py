@@ -0,0 +1,38 @@
+"""
+Array helpers shared by the processing engines
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def to_array(image):
+    """Return the pixels of a PIL image or ndarray as an ndarray (no copy for arrays)"""
+    return np.asarray(image)
+
+
+def like_input(array, image):
+    """Return array in the same container type as the input image"""
+    if isinstance(image, Image.Image):
+        return Image.fromarray(array)
+    return array
+
+
+def to_uint8(array):
+    """Round and clip a float result back to uint8"""
+    return np.clip(np.rint(array), 0, 255).astype(np.uint8)
+
+
+def psnr(reference, test):
+    """Peak signal-to-noise ratio in dB for 8-bit images"""
+    error = np.mean((reference.astype(np.float64) - test.astype(np.float64)) ** 2)
+    return float('inf') if error == 0 else 10.0 * np.log10(255.0 ** 2 / error)
+
+
+def channels_last(array):
+    """Yield (index, 2D channel view) pairs for a gray or color image"""
+    if array.ndim == 2:
+        yield None, array
+    else:
+        for c in range(array.shape[2]):
+            yield c, array[:, :, c]
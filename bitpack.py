@@ -0,0 +1,104 @@
+"""
+Vectorized bit packing and image headers shared by the entropy codecs
+"""
+
+import struct
+import numpy as np
+
+# Kod başına en fazla bu kadar bit (64 bitlik pencereye kaydırma payıyla sığar)
+MAX_CODE_BITS = 32
+# Paketleme bu kadar sembollük bloklarla yapılır: geçici diziler önbellekte kalır
+PACK_BLOCK = 1 << 16
+# Okuyucunun dizi sonunu aşmadan 64 bit bakabilmesi için eklenen boş kelimeler
+GUARD_WORDS = 2
+
+
+def bit_offsets(lengths):
+    """Start bit of every code (exclusive cumulative sum) and the total bit count"""
+    ends = np.cumsum(lengths, dtype=np.int64)
+    total = int(ends[-1]) if len(ends) else 0
+    ends -= lengths
+    return ends, total
+
+
+def pack_into(words, codes, lengths, offsets):
+    """OR variable-length codes (MSB first) into 32-bit words (uint32 or uint64 array) at their bit offsets
+
+    Each code is shifted into a 64-bit window starting at its word; codes
+    never overlap, so the windows of one word add up (np.add.reduceat over
+    the sorted word indices) to the OR of their bits. Codes must be sorted
+    by offset; words needs GUARD_WORDS of slack after the last bit.
+    """
+    for start in range(0, len(lengths), PACK_BLOCK):
+        block = slice(start, start + PACK_BLOCK)
+        position = offsets[block]
+        shift = 64 - (position & 31)
+        shift -= lengths[block]
+        windows = np.left_shift(codes[block].astype(np.uint64, copy=False), shift.view(np.uint64))
+        word = position >> 5
+        firsts = np.flatnonzero(word[1:] != word[:-1]) + 1
+        firsts = np.concatenate([[0], firsts])
+        sums = np.add.reduceat(windows, firsts)
+        index = word[firsts]
+        high = (sums >> np.uint64(32)).astype(words.dtype, copy=False)
+        low = (sums & np.uint64(0xFFFFFFFF)).astype(words.dtype, copy=False)
+        if index[-1] - index[0] == len(index) - 1:
+            # Kesintisiz kodlarda her kelimede bir kod başlar: dağıtma yerine dilim
+            first = int(index[0])
+            words[first:first + len(index)] |= high
+            words[first + 1:first + 1 + len(index)] |= low
+        else:
+            words[index] |= high
+            words[index + 1] |= low
+
+
+def pack_bits(codes, lengths, offsets=None):
+    """Concatenate variable-length codes (MSB first) into big-endian 32-bit words
+
+    Bit offsets come from a cumulative sum of the lengths and pack_into
+    writes the codes. Returns (bytes, total_bits).
+    """
+    codes = np.asarray(codes).ravel()
+    lengths = np.asarray(lengths).ravel()
+    if len(lengths) and int(lengths.max()) > MAX_CODE_BITS:
+        raise ValueError(f"Codes longer than {MAX_CODE_BITS} bits cannot be packed")
+    if offsets is None:
+        offsets, total = bit_offsets(lengths)
+    else:
+        total = int(offsets[-1]) + int(lengths[-1]) if len(lengths) else 0
+    words = np.zeros((total + 31) // 32 + GUARD_WORDS, dtype=np.uint64)
+    pack_into(words, codes, lengths, offsets)
+    return words.astype('>u4').tobytes(), total
+
+
+def unpack_words(data):
+    """Big-endian 32-bit words of a packed stream, widened for peeking"""
+    return np.frombuffer(data, dtype='>u4').astype(np.uint64)
+
+
+def peek(words, positions, width):
+    """width bits (<= 32) starting at each bit position, vectorized over positions"""
+    positions = np.asarray(positions, dtype=np.int64)
+    index = np.minimum(positions >> 5, len(words) - 2)
+    window = (words[index] << np.uint64(32)) | words[index + 1]
+    shift = (64 - width - (positions & 31)).astype(np.uint64)
+    return (window >> shift) & np.uint64((1 << width) - 1)
+
+
+def write_header(magic, array):
+    """Magic, dtype and shape of an image, for the start of a codec stream"""
+    dtype = np.dtype(array.dtype).str.encode()
+    return (struct.pack('<4sBB', magic, len(dtype), array.ndim) + dtype
+            + struct.pack(f'<{array.ndim}I', *array.shape))
+
+
+def read_header(data, magic):
+    """Parse write_header's output: (dtype, shape, offset of the payload)"""
+    found, dtype_length, ndim = struct.unpack_from('<4sBB', data, 0)
+    if found != magic:
+        raise ValueError(f"Not a {magic.decode()} stream")
+    offset = 6
+    dtype = np.dtype(bytes(data[offset:offset + dtype_length]).decode())
+    offset += dtype_length
+    shape = struct.unpack_from(f'<{ndim}I', data, offset)
+    return dtype, shape, offset + 4 * ndim
@@ -5,21 +5,48 @@ Detailed filter controls for individual filter pages
 import streamlit as st
 import sys
 import os
+import time
+import numpy as np
 
 # Add parent directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from filters import (
-    apply_gaussian_blur, apply_edge_detection, apply_threshold,
-    apply_intensity_transform, apply_frequency_filter, 
+    apply_gaussian_blur,
+    apply_frequency_filter, 
     apply_noise_reduction, apply_noise,
-    apply_pseudocolor, apply_color_balance, apply_color_smoothing,
-    convert_color_space, apply_wavelet_transform,
-    compress_jpeg, compress_wavelet, compress_rle, compress_huffman,
-    apply_morphological_operation, apply_morphological_gradient, apply_skeleton,
+    apply_pseudocolor, apply_color_smoothing,
+    convert_color_space,
+    apply_skeleton,
     apply_watershed_segmentation, apply_grabcut_segmentation,
     apply_kmeans_segmentation, extract_features
 )
+from preview import get_preview_proxy, scale_kernel, scale_length
+from histogram import get_histogram_index, color_histogram_features
+from pointwise import intensity_transform, color_balance
+from thresholding import threshold_image
+from morphology import morphology
+from rank import median_filter
+from bilateral import bilateral_grid, DEFAULT_SAMPLING, SAMPLING_RANGE
+from guided import guided_filter, auto_subsample, SUBSAMPLE_RANGE
+from edges import edge_detection
+from wavelets import wavelet_transform
+from rle import compress_rle, decompress_rle, MODES as RLE_MODES
+from wavelet_codec import compress_wavelet, decompress_wavelet
+from rans import compress_rans, decompress_rans
+from jpeg import compress_jpeg, decompress_jpeg, rate_distortion_curve, quality_for_budget
+from codec_registry import available, get_codec
+
+def scale_denoise_params(params, scale):
+    """Scale the spatial noise reduction parameters to the preview proxy"""
+    scaled = dict(params)
+    for key in ('kernel_size', 'd'):
+        if key in scaled:
+            scaled[key] = scale_kernel(scaled[key], scale)
+    for key in ('sigma', 'sigma_space'):
+        if key in scaled:
+            scaled[key] = scale_length(scaled[key], scale)
+    return scaled
 
 def render_fundamentals_filter(filter_name, image, translations):
     """Render fundamental filter controls"""
@@ -41,11 +68,14 @@ def render_fundamentals_filter(filter_name, image, translations):
             )
         
         # Real-time preview
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_gaussian_blur(image, kernel_size, sigma)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
             return apply_gaussian_blur(image, kernel_size, sigma)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return apply_gaussian_blur(proxy, scale_kernel(kernel_size, scale), scale_length(sigma, scale))
     
     elif filter_name == "edge_detection":
         st.markdown("#### 🔍 Edge Detection Parametreleri")
@@ -73,11 +103,15 @@ def render_fundamentals_filter(filter_name, image, translations):
         else:
             blur_size = 5
         
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_edge_detection(image, method, threshold, blur_size)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
+        # Canny: üst eşik slider değeri, alt eşik yarısı (önerilen 2:1 oranı)
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
-            return apply_edge_detection(image, method, threshold, blur_size)
+            return edge_detection(image, method, threshold / 2, threshold, blur_size, threshold=threshold)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return edge_detection(proxy, method, threshold / 2, threshold, scale_kernel(blur_size, scale), threshold=threshold)
     
     elif filter_name == "threshold":
         st.markdown("#### ⚫ Thresholding Parametreleri")
@@ -108,11 +142,14 @@ def render_fundamentals_filter(filter_name, image, translations):
         else:
             threshold_val = 127
         
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_threshold(image, threshold_val, method, max_value)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
-            return apply_threshold(image, threshold_val, method, max_value)
+            return threshold_image(image, method, threshold_val, max_value)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return threshold_image(proxy, method, threshold_val, max_value)
     
     return None
 
@@ -158,11 +195,14 @@ def render_transforms_filter(filter_name, image, translations):
         st.info("Histogram eşitleme için parametre gerekmez")
         transform_key = 'histogram'
     
-    if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-        return apply_intensity_transform(image, transform_key, params)
+    preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
     
     if st.button("✨ Filtreyi Uygula", use_container_width=True):
-        return apply_intensity_transform(image, transform_key, params)
+        return intensity_transform(image, transform_key, params)
+    
+    if preview:
+        proxy, scale = get_preview_proxy(image)
+        return intensity_transform(proxy, transform_key, params)
     
     return None
 
@@ -182,12 +222,16 @@ def render_frequency_filter(filter_name, image, translations):
         'bandpass': 'bandpass'
     }
     
-    if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-        return apply_frequency_filter(image, filter_type_map[filter_name], cutoff)
+    preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
     
     if st.button("✨ Filtreyi Uygula", use_container_width=True):
         return apply_frequency_filter(image, filter_type_map[filter_name], cutoff)
     
+    if preview:
+        proxy, scale = get_preview_proxy(image)
+        # Kesim frekansı görüntü boyutuna göre normalize, ölçeklenmez
+        return apply_frequency_filter(proxy, filter_type_map[filter_name], cutoff)
+    
     return None
 
 def render_restoration_filter(filter_name, image, translations):
@@ -213,11 +257,14 @@ def render_restoration_filter(filter_name, image, translations):
                 help="Gürültü şiddeti"
             )
         
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_noise(image, noise_type, intensity)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
             return apply_noise(image, noise_type, intensity)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return apply_noise(proxy, noise_type, intensity)
     
     elif filter_name == "noise_reduction":
         st.markdown("#### 🧹 Gürültü Azaltma Parametreleri")
@@ -226,34 +273,71 @@ def render_restoration_filter(filter_name, image, translations):
         with col1:
             method = st.selectbox(
                 "🛠️ Yöntem", 
-                options=["gaussian", "median", "bilateral"],
+                options=["gaussian", "median", "bilateral", "bilateral_grid", "guided"],
                 format_func=lambda x: {
                     "gaussian": "Gaussian Filtreleme",
                     "median": "Median Filtreleme",
-                    "bilateral": "Bilateral Filtreleme"
+                    "bilateral": "Bilateral Filtreleme",
+                    "bilateral_grid": "Bilateral (Hızlı Izgara)",
+                    "guided": "Yönlendirilmiş Filtre (Guided)"
                 }[x]
             )
         with col2:
             kernel_size = st.slider(
                 "🔧 Kernel Boyutu", 
-                min_value=3, max_value=15, value=5, step=2
+                min_value=3, max_value=51 if method == 'median' else 15, value=5, step=2
             )
         
         params = {'kernel_size': kernel_size}
-        if method == 'bilateral':
+        if method in ('bilateral', 'bilateral_grid'):
             params.update({
-                'd': st.slider("📏 Filtre Çapı", 5, 15, 9, step=2),
+                'd': st.slider("📏 Filtre Çapı", 5, 51 if method == 'bilateral_grid' else 15, 9, step=2),
                 'sigma_color': st.slider("🎨 Renk Sigma", 10, 150, 75),
                 'sigma_space': st.slider("📍 Uzay Sigma", 10, 150, 75)
             })
+            if method == 'bilateral_grid':
+                params['sampling'] = st.slider("🧮 Izgara Kalitesi", *SAMPLING_RANGE, DEFAULT_SAMPLING, step=0.5,
+                                               help="Sigma başına hücre sayısı: yüksek değer daha ince ızgara, daha yavaş")
+        elif method == 'guided':
+            # Maliyet yarıçapa bağlı değil; büyük yarıçaplar açık
+            radius = st.slider("📏 Yarıçap", 1, 64, 8)
+            params.update({
+                'radius': radius,
+                'eps': st.slider("🎚️ Düzgünleştirme (eps)", 0.0001, 0.1, 0.01, step=0.0001, format="%.4f",
+                                 help="Varyansı eps'ten küçük bölgeler düzleşir, büyük kenarlar korunur"),
+                'guide': st.selectbox("🧭 Kılavuz", options=["self", "luma"],
+                                      format_func=lambda x: {"self": "Kendisi (kanal başına)",
+                                                             "luma": "Parlaklık (çapraz)"}[x]),
+                'subsample': st.slider("⚡ Alt Örnekleme", *SUBSAMPLE_RANGE, auto_subsample(radius),
+                                       help="Katsayılar bu oranda küçültülmüş ızgarada hesaplanır (hızlı guided filtre)")
+            })
         elif method == 'gaussian':
             params['sigma'] = st.slider("📊 Sigma", 0.1, 3.0, 1.0, step=0.1)
         
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_noise_reduction(image, method, params)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
+            if method == 'guided':
+                return guided_filter(image, params['radius'], params['eps'], params['guide'], params['subsample'])
+            if method == 'median':
+                return median_filter(image, kernel_size)
+            if method == 'bilateral_grid':
+                return bilateral_grid(image, params['d'], params['sigma_color'], params['sigma_space'], params['sampling'])
             return apply_noise_reduction(image, method, params)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            if method == 'guided':
+                # Alt örnekleme oranı da önizleme ölçeğine indirgenir (ızgara aynı kalır)
+                subsample = max(1, int(round(params['subsample'] * scale)))
+                return guided_filter(proxy, scale_length(params['radius'], scale, 1), params['eps'],
+                                     params['guide'], subsample)
+            if method == 'median':
+                return median_filter(proxy, scale_kernel(kernel_size, scale))
+            if method == 'bilateral_grid':
+                scaled = scale_denoise_params(params, scale)
+                return bilateral_grid(proxy, scaled['d'], scaled['sigma_color'], scaled['sigma_space'], params['sampling'])
+            return apply_noise_reduction(proxy, method, scale_denoise_params(params, scale))
     
     return None
 
@@ -277,11 +361,14 @@ def render_color_filter(filter_name, image, translations):
         with col3:
             b_scale = st.slider("🔵 Mavi", 0.1, 3.0, 1.0, step=0.1)
         
-        if st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True):
-            return apply_color_balance(image, r_scale, g_scale, b_scale)
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
         
         if st.button("✨ Filtreyi Uygula", use_container_width=True):
-            return apply_color_balance(image, r_scale, g_scale, b_scale)
+            return color_balance(image, r_scale, g_scale, b_scale)
+        
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return color_balance(proxy, r_scale, g_scale, b_scale)
     
     elif filter_name == "color_space":
         st.markdown("#### 🔄 Renk Uzayı Dönüşümü")
@@ -324,11 +411,27 @@ def render_wavelet_filter(filter_name, image, translations):
         )
     
     if filter_name == "wavelet_transform":
+        # Piramit görüntü ve dalgacık başına önbellekte; seviye artışı yalnızca eksik seviyeleri ayrıştırır
         if st.button("✨ Wavelet Dönüşümü Uygula", use_container_width=True):
-            return apply_wavelet_transform(image, wavelet_type, level)
+            return wavelet_transform(image, wavelet_type, level)
     
     return None
 
+def lossless_roundtrip(compress, decompress, image, name=None):
+    """Encode and decode image, reporting ratio and throughput under the controls"""
+    raw_bytes = np.asarray(image).nbytes
+    start = time.perf_counter()
+    data = compress(image)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = decompress(data, image)
+    decode_time = time.perf_counter() - start
+    label = f"{name} · " if name else ""
+    st.caption(f"📦 {label}Oran {raw_bytes / len(data):.2f}:1 · {8.0 * len(data) / raw_bytes:.2f} bit/bayt · "
+               f"kodlama {raw_bytes / 1e6 / max(encode_time, 1e-9):.0f} MB/s · "
+               f"çözme {raw_bytes / 1e6 / max(decode_time, 1e-9):.0f} MB/s")
+    return result
+
 def render_compression_filter(filter_name, image, translations):
     """Render compression controls"""
     st.markdown("#### 📦 Sıkıştırma Parametreleri")
@@ -339,16 +442,65 @@ def render_compression_filter(filter_name, image, translations):
         help="Sıkıştırma kalitesi (yüksek = daha iyi kalite)"
     )
     
-    compression_map = {
-        'jpeg': compress_jpeg,
-        'wavelet_compress': compress_wavelet,
-        'rle': compress_rle,
-        'huffman': compress_huffman
-    }
+    # Kayıpsız kodekler kayıttan gelir: (kodlayıcı, çözücü); kalite kullanılmaz
+    lossless_map = {codec.name: (codec.compress, codec.decompress) for codec in available(image, lossless=True, demo=True)}
+    if filter_name == 'rle':
+        rle_mode = st.selectbox(
+            "🧱 RLE Modu",
+            options=list(RLE_MODES),
+            format_func=lambda x: {
+                "scanline": "Satır (piksel koşuları)",
+                "planar": "Düzlemsel (kanal başına)",
+                "bitplane": "Bit düzlemi (maskeler için)"
+            }[x]
+        )
+        lossless_map['rle'] = (lambda data: compress_rle(data, mode=rle_mode), decompress_rle)
+    if filter_name == 'rans':
+        use_context = st.checkbox(
+            "🧭 Komşu Bağlam Modeli", value=True,
+            help="Pikseli sol/üst komşularının ortalamasından öngörür, farkı |sol - üst| bağlamına göre kodlar (8 bit)"
+        )
+        lossless_map['rans'] = (lambda data: compress_rans(data, context=use_context), decompress_rans)
+        if st.checkbox("⚖️ Huffman ile Karşılaştır", value=False):
+            huffman = get_codec('huffman')
+            lossless_roundtrip(huffman.compress, huffman.decompress, image, name="Huffman")
+    
+    if filter_name in lossless_map:
+        if st.button("✨ Sıkıştırmayı Uygula", use_container_width=True):
+            return lossless_roundtrip(*lossless_map[filter_name], image)
     
-    if filter_name in compression_map:
+    if filter_name == 'wavelet_compress':
+        # Akış görüntü başına bir kez tam kalitede kodlanır; kalite yalnızca öneki keser
+        preview = st.checkbox("🔄 Gerçek Zamanlı Önizleme", value=True)
+        if st.button("✨ Sıkıştırmayı Uygula", use_container_width=True):
+            data = compress_wavelet(image, quality)
+            st.caption(f"📦 {len(data) / 1024:.1f} KB · Oran {np.asarray(image).nbytes / len(data):.1f}:1")
+            return decompress_wavelet(data, image)
+        if preview:
+            proxy, scale = get_preview_proxy(image)
+            return decompress_wavelet(compress_wavelet(proxy, quality), proxy)
+    
+    if filter_name == 'jpeg':
+        # Renk dönüşümü ve blok DCT görüntü başına bir kez; her kalite yalnızca yeniden nicelenir
+        budget_kb = st.number_input(
+            "💾 Bayt Bütçesi (KB)", min_value=0, value=0, step=10,
+            help="0 dışında bir değer, bütçeye sığan en yüksek kaliteyi seçer (kalite kaydırıcısı yok sayılır)"
+        )
+        if st.checkbox("📈 Oran–Bozulma Eğrisi (1-100)", value=False):
+            curve = rate_distortion_curve(image)
+            st.line_chart({'KB': [size / 1024 for _, size, _, _ in curve]})
+            st.line_chart({'PSNR (dB)': [value for _, _, value, _ in curve],
+                           'SSIM x 50': [50 * value for _, _, _, value in curve]})
+            _, size, value, ssim = curve[quality - 1]
+            st.caption(f"Kalite {quality}: ~{size / 1024:.1f} KB · PSNR ~{value:.2f} dB · SSIM ~{ssim:.4f}")
         if st.button("✨ Sıkıştırmayı Uygula", use_container_width=True):
-            return compression_map[filter_name](image, quality)
+            if budget_kb:
+                quality, data = quality_for_budget(image, budget_kb * 1024)
+            else:
+                data = compress_jpeg(image, quality)
+            st.caption(f"📦 Kalite {quality} · {len(data) / 1024:.1f} KB · "
+                       f"Oran {np.asarray(image).nbytes / len(data):.1f}:1")
+            return decompress_jpeg(data, image)
     
     return None
 
@@ -381,7 +533,7 @@ def render_morphological_filter(filter_name, image, translations):
     
     if filter_name in operation_map:
         if st.button("✨ İşlemi Uygula", use_container_width=True):
-            return apply_morphological_operation(
+            return morphology(
                 image, operation_map[filter_name], 
                 kernel_shape, kernel_size, iterations
             )
@@ -424,7 +576,10 @@ def render_features_filter(filter_name, image, translations):
     
     if filter_name in feature_map:
         if st.button("✨ Özellikleri Çıkar", use_container_width=True):
-            features = extract_features(image, feature_map[filter_name])
+            if feature_map[filter_name] == 'color_hist':
+                features = color_histogram_features(get_histogram_index(image))
+            else:
+                features = extract_features(image, feature_map[filter_name])
             st.json(features)
             return image  # Return original image since this is analysis
     
@@ -10,18 +10,25 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from filters import (
-    apply_gaussian_blur, apply_edge_detection, apply_threshold,
-    apply_intensity_transform, apply_frequency_filter, 
+    apply_gaussian_blur,
+    apply_frequency_filter, 
     apply_noise_reduction, apply_noise,
-    apply_pseudocolor, apply_color_balance, apply_color_smoothing,
-    convert_color_space, apply_wavelet_transform,
-    compress_jpeg, compress_wavelet, compress_rle, compress_huffman,
-    apply_morphological_operation, apply_morphological_gradient, apply_skeleton,
+    apply_pseudocolor, apply_color_smoothing,
+    convert_color_space,
+    apply_skeleton,
     apply_watershed_segmentation, apply_grabcut_segmentation,
     apply_kmeans_segmentation, extract_features
 )
 
 from utils import create_info_expander
+from histogram import get_histogram_index, color_histogram_features
+from pointwise import intensity_transform, color_balance
+from thresholding import threshold_image
+from morphology import morphology
+from rank import median_filter
+from edges import edge_detection
+from wavelets import wavelet_transform
+from codec_registry import available
 
 def render_filter_controls(category, image, translations):
     """Render filter controls based on category"""
@@ -80,7 +87,7 @@ def render_fundamentals_controls(image, translations):
         
         if st.button(translations['apply_filter'], key="edge_apply"):
             method_key = 'sobel' if method == translations['sobel'] else 'canny'
-            return apply_edge_detection(image, method_key, threshold)
+            return edge_detection(image, method_key, threshold / 2, threshold, threshold=threshold)
     
     elif filter_type == translations['threshold']:
         col1, col2, col3 = st.columns(3)
@@ -97,7 +104,7 @@ def render_fundamentals_controls(image, translations):
                 {translations['binary']: 'binary', translations['otsu']: 'otsu', 
                  translations['adaptive']: 'adaptive'}[method]
             ]
-            return apply_threshold(image, threshold_val, method_key, max_val)
+            return threshold_image(image, method_key, threshold_val, max_val)
     
     return None
 
@@ -133,7 +140,7 @@ def render_transforms_controls(image, translations):
         transform_key = 'histogram'
     
     if st.button(translations['apply_filter'], key="transform_apply"):
-        return apply_intensity_transform(image, transform_key, params)
+        return intensity_transform(image, transform_key, params)
     
     return None
 
@@ -205,6 +212,8 @@ def render_restoration_controls(image, translations):
                 translations['median']: 'median',
                 translations['bilateral']: 'bilateral'
             }[method]
+            if method_key == 'median':
+                return median_filter(image, kernel_size)
             return apply_noise_reduction(image, method_key, params)
     
     return None
@@ -229,7 +238,7 @@ def render_color_controls(image, translations):
             b_scale = st.slider(translations['b_scale'], 0.1, 2.0, 1.0, step=0.1)
         
         if st.button(translations['apply_filter'], key="color_balance_apply"):
-            return apply_color_balance(image, r_scale, g_scale, b_scale)
+            return color_balance(image, r_scale, g_scale, b_scale)
     
     elif operation == translations['color_smoothing']:
         kernel_size = st.slider(translations['kernel_size'], 3, 15, 5, step=2)
@@ -274,7 +283,7 @@ def render_wavelets_controls(image, translations):
             translations['db4']: 'db4',
             translations['bior2.2']: 'bior2.2'
         }[wavelet_type]
-        return apply_wavelet_transform(image, wavelet_key, level)
+        return wavelet_transform(image, wavelet_key, level)
     
     return None
 
@@ -282,27 +291,17 @@ def render_compression_controls(image, translations):
     """Render compression controls"""
     st.subheader(translations['compression'])
     
+    codecs = available(image, demo=True)
     col1, col2 = st.columns(2)
     with col1:
-        compression_type = st.selectbox(translations['compression_type'], 
-                                      [translations['jpeg'], translations['wavelet'], 
-                                       translations['rle'], translations['huffman']])
+        codec = st.selectbox(translations['compression_type'], codecs,
+                             format_func=lambda codec: translations[codec.name])
     with col2:
-        quality = st.slider(translations['quality'], 10, 100, 80)
+        quality = st.slider(translations['quality'], 10, 100, 80, disabled=not codec.uses_quality)
     
     if st.button(translations['apply_filter'], key="compression_apply"):
-        if compression_type == translations['jpeg']:
-            compressed_data = compress_jpeg(image, quality)
-            return decompress_jpeg(compressed_data)
-        elif compression_type == translations['wavelet']:
-            compressed_data = compress_wavelet(image, quality)
-            return decompress_wavelet(compressed_data)
-        elif compression_type == translations['rle']:
-            compressed_data = compress_rle(image, quality)
-            return decompress_rle(compressed_data)
-        else:  # huffman
-            compressed_data = compress_huffman(image, quality)
-            return decompress_huffman(compressed_data)
+        compressed_data = codec.compress(image, quality)
+        return codec.decompress(compressed_data, image)
     
     return None
 
@@ -337,7 +336,7 @@ def render_morphological_controls(image, translations):
             translations['cross']: 'cross'
         }[kernel_shape]
         
-        return apply_morphological_operation(image, operation_key, shape_key, kernel_size, iterations)
+        return morphology(image, operation_key, shape_key, kernel_size, iterations)
     
     return None
 
@@ -378,7 +377,11 @@ def render_features_controls(image, translations):
             translations['color_hist']: 'color_hist'
         }[feature_type]
         
-        features = extract_features(image, feature_key)
+        if feature_key == 'color_hist':
+            # Renk histogramı görüntünün paylaşılan histogram indeksinden okunur
+            features = color_histogram_features(get_histogram_index(image))
+        else:
+            features = extract_features(image, feature_key)
         
         # Display features in a nice format
         st.write("### Extracted Features:")
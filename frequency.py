@@ -0,0 +1,129 @@
+"""
+Frequency domain filtering on a cached real-input FFT
+"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+
+from arrays import to_array, like_input, to_uint8
+from result_cache import image_digest
+
+PROFILES = ('ideal', 'butterworth', 'gaussian')
+FILTER_TYPES = ('lowpass', 'highpass', 'bandpass')
+
+# Kaç görüntünün spektrumu bellekte tutulur
+MAX_CACHED_SPECTRA = 4
+
+_spectra = OrderedDict()
+_spectra_lock = threading.Lock()
+
+
+def get_spectrum(image, image_key=None):
+    """Return the per-channel float32 rFFT of image, computed once per image
+
+    The result is a complex64 array of shape (channels, H, W // 2 + 1).
+    """
+    array = to_array(image)
+    if image_key is None:
+        image_key = image_digest(array)
+    with _spectra_lock:
+        spectrum = _spectra.get(image_key)
+        if spectrum is not None:
+            _spectra.move_to_end(image_key)
+            return spectrum
+
+    planes = array[:, :, None] if array.ndim == 2 else array
+    spectrum = np.empty((planes.shape[2], planes.shape[0], planes.shape[1] // 2 + 1), dtype=np.complex64)
+    for c in range(planes.shape[2]):
+        spectrum[c] = np.fft.rfft2(planes[:, :, c].astype(np.float32))
+    spectrum.flags.writeable = False
+
+    with _spectra_lock:
+        _spectra[image_key] = spectrum
+        while len(_spectra) > MAX_CACHED_SPECTRA:
+            _spectra.popitem(last=False)
+    return spectrum
+
+
+@lru_cache(maxsize=8)
+def radial_grid(shape):
+    """Distance from DC (in cycles per image) for the rFFT layout of shape (H, W)"""
+    height, width = shape
+    v = (np.fft.fftfreq(height) * height).astype(np.float32)
+    u = (np.fft.rfftfreq(width) * width).astype(np.float32)
+    grid = np.sqrt(v[:, None] ** 2 + u[None, :] ** 2)
+    grid.flags.writeable = False
+    return grid
+
+
+def _lowpass(distance, cutoff, profile, order):
+    if profile == 'ideal':
+        return (distance <= cutoff).astype(np.float32)
+    if profile == 'butterworth':
+        return 1.0 / (1.0 + (distance / cutoff) ** (2 * order))
+    return np.exp(-(distance ** 2) / (2.0 * cutoff ** 2))
+
+
+def _bandpass(distance, center, width, profile, order):
+    if profile == 'ideal':
+        return (np.abs(distance - center) <= width / 2.0).astype(np.float32)
+    # Gonzalez & Woods bant reddeden filtrelerinin tümleyeni
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (distance ** 2 - center ** 2) / (distance * width)
+    ratio[0, 0] = -np.inf  # DC her zaman bant dışında
+    if profile == 'butterworth':
+        with np.errstate(divide='ignore', over='ignore'):
+            return 1.0 - 1.0 / (1.0 + (1.0 / ratio) ** (2 * order))
+    return np.exp(-ratio ** 2)
+
+
+@lru_cache(maxsize=16)
+def transfer_mask(shape, filter_type, cutoff, profile='ideal', order=2, band_width=None):
+    """Transfer function H(u, v) for the rFFT layout of shape, cached by its parameters"""
+    if filter_type not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter type: {filter_type}")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile: {profile}")
+
+    distance = radial_grid(shape)
+    cutoff = max(float(cutoff), 1e-3)
+    if filter_type == 'bandpass':
+        width = float(band_width) if band_width else cutoff
+        mask = _bandpass(distance, cutoff, width, profile, order)
+    else:
+        mask = _lowpass(distance, cutoff, profile, order)
+        if filter_type == 'highpass':
+            mask = 1.0 - mask
+    mask = mask.astype(np.float32)
+    mask.flags.writeable = False
+    return mask
+
+
+def frequency_filter(image, filter_type, cutoff, profile='ideal', order=2, band_width=None, image_key=None):
+    """Filter image in the frequency domain
+
+    cutoff is a radius in cycles per image (DFT bins). For bandpass it is
+    the band center and band_width (default: cutoff) the band width. Only the
+    first call per image pays for the forward FFT; later calls cost one mask
+    multiply and one inverse rFFT per channel.
+    """
+    array = to_array(image)
+    spectrum = get_spectrum(array, image_key)
+    shape = array.shape[:2]
+    mask = transfer_mask(shape, filter_type, float(cutoff), profile, int(order),
+                         None if band_width is None else float(band_width))
+
+    output = np.empty(array.shape, dtype=np.float32)
+    planes = output[:, :, None] if output.ndim == 2 else output
+    for c in range(spectrum.shape[0]):
+        planes[:, :, c] = np.fft.irfft2(spectrum[c] * mask, s=shape)
+
+    if filter_type == 'lowpass':
+        result = to_uint8(output)
+    else:
+        # DC bileşeni kalktığı için sonucu görüntüleme aralığına ölçekle
+        low, high = output.min(), output.max()
+        result = to_uint8((output - low) * (255.0 / max(high - low, 1e-6)))
+    return like_input(result, image)
@@ -0,0 +1,182 @@
+"""
+Guided filter (He et al. 2013): edge-preserving smoothing from box means over integral images
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+from result_cache import image_digest
+
+GUIDE_MODES = ('self', 'luma')
+# Düzenleme terimi 0..1 ölçeğindeki varyans cinsinden ((0.1)^2)
+DEFAULT_EPS = 0.01
+SUBSAMPLE_RANGE = (1, 8)
+# Ortalamalar bu kadar satırlık şeritlerle hesaplanır (geçici bellek sınırı)
+STRIP_ROWS = 512
+MAX_CACHED_STATISTICS = 1
+
+_statistics = OrderedDict()
+_statistics_lock = threading.Lock()
+
+
+def _normalized(array):
+    """float32 copy scaled to 0..1 (integer types by their maximum)"""
+    scale = float(np.iinfo(array.dtype).max) if np.issubdtype(array.dtype, np.integer) else 1.0
+    return array.astype(np.float32) / np.float32(scale), scale
+
+
+def _luma(planes):
+    if planes.ndim == 2:
+        return planes
+    return cv2.cvtColor(np.ascontiguousarray(planes[:, :, :3]), cv2.COLOR_RGB2GRAY)
+
+
+def _integral(array):
+    return cv2.integral(np.ascontiguousarray(array), sdepth=cv2.CV_64F)
+
+
+def _column_sums(rows, radius, width):
+    """Window sums along columns of row-differenced tables, clamped at the border"""
+    output = np.empty((rows.shape[0], width) + rows.shape[2:], dtype=np.float64)
+    # İç sütunlar iki dilimin farkı; yalnızca kenardaki sütunlar indeksle toplanır
+    inner = slice(radius, max(radius, width - radius))
+    np.subtract(rows[:, 2 * radius + 1:2 * radius + 1 + inner.stop - inner.start],
+                rows[:, :inner.stop - inner.start], out=output[:, inner])
+    edge = np.r_[0:min(radius, width), max(radius, width - radius):width]
+    output[:, edge] = rows[:, np.minimum(edge + radius + 1, width)] - rows[:, np.maximum(edge - radius, 0)]
+    return output
+
+
+def box_mean(table, radius):
+    """Mean of every (2r+1) x (2r+1) window from a summed-area table
+
+    Windows are clipped at the image border (divided by the pixels they
+    cover), so the cost per pixel is four table reads whatever the radius.
+    """
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    index = np.arange(height)
+    top, bottom = np.maximum(index - radius, 0), np.minimum(index + radius + 1, height)
+    columns = np.arange(width)
+    col_extent = (np.minimum(columns + radius + 1, width) - np.maximum(columns - radius, 0)).astype(np.float64)
+    output = np.empty((height, width) + table.shape[2:], dtype=np.float32)
+    for start in range(0, height, STRIP_ROWS):
+        stop = min(height, start + STRIP_ROWS)
+        sums = _column_sums(table[bottom[start:stop]] - table[top[start:stop]], radius, width)
+        counts = (bottom[start:stop] - top[start:stop])[:, None] * col_extent[None, :]
+        if table.ndim == 3:
+            counts = counts[:, :, None]
+        np.divide(sums, counts, out=output[start:stop], casting='unsafe')
+    return output
+
+
+def _downsample(array, factor):
+    if factor == 1:
+        return array
+    height, width = array.shape[:2]
+    size = (max(1, -(-width // factor)), max(1, -(-height // factor)))
+    return cv2.resize(array, size, interpolation=cv2.INTER_AREA)
+
+
+def get_statistics(planes, guide, factor, key):
+    """Downsampled guide and input with the summed-area tables of I, I^2, p and I*p
+
+    None of the tables depend on the radius or eps, so slider changes only
+    redo the O(1) box lookups. In self mode every channel is its own guide,
+    so p and I*p are the tables of I and I^2.
+    """
+    with _statistics_lock:
+        entry = _statistics.get(key)
+        if entry is not None:
+            _statistics.move_to_end(key)
+            return entry
+    low_p = _downsample(planes, factor)
+    if guide is None:
+        low_i = low_p
+        total, squared = cv2.integral2(np.ascontiguousarray(low_i), sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        entry = (low_i, low_p, (total, squared, total, squared))
+    else:
+        low_i = _downsample(guide, factor)
+        total, squared = cv2.integral2(np.ascontiguousarray(low_i), sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        product = low_p * (low_i[:, :, None] if low_p.ndim == 3 else low_i)
+        entry = (low_i, low_p, (total, squared, _integral(low_p), _integral(product)))
+    with _statistics_lock:
+        _statistics[key] = entry
+        while len(_statistics) > MAX_CACHED_STATISTICS:
+            _statistics.popitem(last=False)
+    return entry
+
+
+def auto_subsample(radius):
+    """Subsampling factor of the fast guided filter, r/4 as suggested by He and Sun"""
+    return int(np.clip(int(radius) // 4, *SUBSAMPLE_RANGE))
+
+
+def guided_filter(image, radius=8, eps=DEFAULT_EPS, guide='self', subsample=None, image_key=None):
+    """Guided filter of a PIL image or ndarray
+
+    guide is 'self' (every channel guides itself), 'luma' (the image's own
+    luma guides all channels) or another image of the same size, whose luma
+    is used (cross-guided filtering, e.g. flash/no-flash). eps is the
+    regularization on the 0..1 intensity scale: windows with variance well
+    below eps are smoothed, edges with variance above it are kept.
+
+    The linear coefficients a, b are fitted on a grid subsampled by
+    ``subsample`` (the fast guided filter; None picks r/4) and upsampled
+    bilinearly before q = mean(a) * I + mean(b) at full resolution. All
+    window means come from summed-area tables, so the cost per pixel does
+    not depend on the radius.
+    """
+    array = to_array(image)
+    planes, scale = _normalized(array)
+    factor = auto_subsample(radius) if subsample is None else int(np.clip(subsample, *SUBSAMPLE_RANGE))
+    if image_key is None:
+        image_key = image_digest(array)
+
+    if isinstance(guide, str):
+        if guide not in GUIDE_MODES:
+            raise ValueError(f"Unknown guide mode: {guide}")
+        guide_key = guide
+        full_guide = None if guide == 'self' or planes.ndim == 2 else _luma(planes)
+    else:
+        guide_array = to_array(guide)
+        guide_key = image_digest(guide_array)
+        full_guide = _luma(_normalized(guide_array)[0])
+        if full_guide.shape != planes.shape[:2]:
+            full_guide = cv2.resize(full_guide, (planes.shape[1], planes.shape[0]), interpolation=cv2.INTER_LINEAR)
+
+    low_i, low_p, tables = get_statistics(planes, full_guide, factor, (image_key, guide_key, factor))
+    radius = max(1, int(round(radius / factor)))
+    sum_i, sum_ii, sum_p, sum_ip = tables
+
+    mean_i = box_mean(sum_i, radius)
+    variance = box_mean(sum_ii, radius) - mean_i * mean_i
+    if full_guide is None:
+        mean_p, covariance = mean_i, variance
+    else:
+        if low_p.ndim == 3:
+            mean_i, variance = mean_i[:, :, None], variance[:, :, None]
+        mean_p = box_mean(sum_p, radius)
+        covariance = box_mean(sum_ip, radius) - mean_i * mean_p
+    a = covariance / (variance + np.float32(eps))
+    b = mean_p - a * mean_i
+    mean_a = box_mean(_integral(a), radius)
+    mean_b = box_mean(_integral(b), radius)
+
+    height, width = planes.shape[:2]
+    if factor > 1:
+        mean_a = cv2.resize(mean_a, (width, height), interpolation=cv2.INTER_LINEAR)
+        mean_b = cv2.resize(mean_b, (width, height), interpolation=cv2.INTER_LINEAR)
+    if full_guide is None:
+        result = mean_a.reshape(planes.shape) * planes + mean_b.reshape(planes.shape)
+    else:
+        guide_full = full_guide[:, :, None] if planes.ndim == 3 else full_guide
+        result = mean_a.reshape(planes.shape) * guide_full + mean_b.reshape(planes.shape)
+
+    result = result * np.float32(scale)
+    if np.issubdtype(array.dtype, np.integer):
+        info = np.iinfo(array.dtype)
+        result = np.clip(np.rint(result), info.min, info.max).astype(array.dtype)
+    return like_input(result, image)
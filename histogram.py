@@ -0,0 +1,112 @@
+"""
+Histogram index computed once per image and shared by stats, thresholds and plots
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+from arrays import to_array
+from result_cache import image_digest
+
+CHANNEL_NAMES = ('red', 'green', 'blue')
+MAX_CACHED_INDEXES = 8
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class HistogramIndex:
+    """256-bin per-channel and luma histograms, plus a lazy joint RGB variant
+
+    Only counts are kept: the index never holds on to the frame, so the
+    cached indexes do not pin images in memory.
+    """
+
+    def __init__(self, array):
+        self.shape = array.shape
+        self.pixels = array.shape[0] * array.shape[1]
+        # calcHist kanalları kopyalamadan (strided) okur: kanal başına tek geçiş
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        self.channels = np.stack([
+            cv2.calcHist([array], [c], None, [256], [0, 256]).ravel().astype(np.int64)
+            for c in range(channels)
+        ])
+        if self.is_color:
+            luma = cv2.cvtColor(np.ascontiguousarray(array), cv2.COLOR_RGB2GRAY)
+            self.gray = cv2.calcHist([luma], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+        else:
+            # Otsu için parlaklık histogramı
+            self.gray = self.channels[0]
+        self._joint = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_color(self):
+        return self.channels.shape[0] == 3
+
+    def joint(self, array):
+        """Sparse joint histogram of array (the indexed image): (packed 24-bit RGB keys, counts)"""
+        with self._lock:
+            if self._joint is None:
+                if self.is_color:
+                    keys = ((array[:, :, 0].astype(np.uint32) << 16)
+                            | (array[:, :, 1].astype(np.uint32) << 8)
+                            | array[:, :, 2])
+                    counts = np.bincount(keys.ravel(), minlength=1 << 24)
+                else:
+                    counts = self.channels[0]
+                present = np.flatnonzero(counts).astype(np.uint32)
+                self._joint = (present, counts[present])
+            return self._joint
+
+    def combined(self):
+        """Histogram of all channel values together"""
+        return self.channels.sum(axis=0)
+
+    def mean(self):
+        """Per-channel mean from the histograms"""
+        levels = np.arange(256, dtype=np.float64)
+        return self.channels @ levels / self.pixels
+
+    def std(self):
+        """Per-channel standard deviation from the histograms"""
+        levels = np.arange(256, dtype=np.float64)
+        mean = self.mean()
+        second = self.channels @ (levels ** 2) / self.pixels
+        return np.sqrt(np.maximum(second - mean ** 2, 0.0))
+
+    def rebin(self, bins):
+        """Per-channel histograms merged into fewer equal-width bins"""
+        edges = np.linspace(0, 256, bins + 1).astype(int)
+        return np.add.reduceat(self.channels, edges[:-1], axis=1)
+
+
+def get_histogram_index(image, image_key=None):
+    """Return the histogram index of image, built once per image content"""
+    array = to_array(image)
+    if image_key is None:
+        image_key = image_digest(array)
+    with _indexes_lock:
+        index = _indexes.get(image_key)
+        if index is not None:
+            _indexes.move_to_end(image_key)
+            return index
+    index = HistogramIndex(array)
+    with _indexes_lock:
+        _indexes[image_key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def color_histogram_features(index, bins=16):
+    """Normalized per-channel color histogram feature vector"""
+    names = CHANNEL_NAMES if index.is_color else ('gray',)
+    rebinned = index.rebin(bins) / index.pixels
+    features = {f'{name}_hist': [round(float(v), 4) for v in rebinned[i]] for i, name in enumerate(names)}
+    for i, name in enumerate(names):
+        features[f'{name}_mean'] = round(float(index.mean()[i]), 2)
+        features[f'{name}_std'] = round(float(index.std()[i]), 2)
+    return features
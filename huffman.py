@@ -0,0 +1,233 @@
+"""
+Canonical Huffman codec for image bytes: bincount code lengths, vectorized packing, table decoding
+"""
+
+import heapq
+import struct
+import sys
+import time
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+from bitpack import pack_into, unpack_words, peek, write_header, read_header, GUARD_WORDS, PACK_BLOCK
+
+MAGIC = b'HUF1'
+# Çözme tablosu 2^MAX_CODE_LENGTH girişli; daha uzun kodlar frekanslar yarılanarak kısaltılır
+MAX_CODE_LENGTH = 16
+# Şerit başına sembol sayısı sınırları; şeritler aynı anda (vektörel) çözülür
+MIN_LANE_SYMBOLS = 256
+MAX_LANE_SYMBOLS = 4096
+# Bayt histogramı bu büyüklükte parçalarla sayılır (float32 sayaçlar kesin kalır)
+HISTOGRAM_BLOCK = 1 << 24
+
+
+def _huffman_lengths(counts):
+    """Huffman code length of every symbol with a nonzero count"""
+    symbols = np.flatnonzero(counts)
+    lengths = np.zeros(len(counts), dtype=np.int64)
+    if len(symbols) == 1:
+        lengths[symbols] = 1
+        return lengths
+    # (ağırlık, sıra, semboller): sıra eşit ağırlıklarda karşılaştırmayı sabitler
+    heap = [(int(counts[s]), i, [int(s)]) for i, s in enumerate(symbols)]
+    heapq.heapify(heap)
+    order = len(heap)
+    while len(heap) > 1:
+        w1, _, s1 = heapq.heappop(heap)
+        w2, _, s2 = heapq.heappop(heap)
+        lengths[s1 + s2] += 1
+        heapq.heappush(heap, (w1 + w2, order, s1 + s2))
+        order += 1
+    return lengths
+
+
+def code_lengths(counts, limit=MAX_CODE_LENGTH):
+    """Huffman code lengths capped at limit bits
+
+    Counts are halved (keeping every used symbol at least 1) until the
+    longest code fits; for 8-bit data this rarely costs more than a
+    fraction of a percent.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    lengths = _huffman_lengths(counts)
+    while lengths.max() > limit:
+        counts = np.where(counts > 0, np.maximum(counts >> 1, 1), 0)
+        lengths = _huffman_lengths(counts)
+    return lengths
+
+
+def canonical_codes(lengths):
+    """Canonical codes: symbols sorted by (length, value) get consecutive codes"""
+    codes = np.zeros(len(lengths), dtype=np.uint64)
+    code, previous = 0, 0
+    for symbol in np.lexsort((np.arange(len(lengths)), lengths)):
+        length = int(lengths[symbol])
+        if length == 0:
+            continue
+        code <<= length - previous
+        codes[symbol] = code
+        code += 1
+        previous = length
+    return codes
+
+
+def decode_table(lengths, codes):
+    """(symbol, length) for every max-length bit pattern, indexed by the pattern"""
+    width = int(lengths.max())
+    symbols = np.zeros(1 << width, dtype=np.uint8)
+    # Kullanılmayan desenler (tek sembol durumu) bir bit ilerletir
+    sizes = np.ones(1 << width, dtype=np.int64)
+    for symbol in np.flatnonzero(lengths):
+        span = width - int(lengths[symbol])
+        start = int(codes[symbol]) << span
+        symbols[start:start + (1 << span)] = symbol
+        sizes[start:start + (1 << span)] = lengths[symbol]
+    return symbols, sizes, width
+
+
+def _lane_size(count):
+    # Çift uzunluk: şerit başları sembol çiftlerinin sınırına düşer
+    return int(np.clip(int(np.sqrt(count)), MIN_LANE_SYMBOLS, MAX_LANE_SYMBOLS)) & ~1
+
+
+def byte_histogram(symbols):
+    """np.bincount of a uint8 array via cv2.calcHist (no intp copy of the input)"""
+    counts = np.zeros(256, dtype=np.int64)
+    # calcHist float32 sayar: parçalar 2^24'ü aşmaz, toplam tamsayıdır
+    for start in range(0, len(symbols), HISTOGRAM_BLOCK):
+        block = symbols[start:start + HISTOGRAM_BLOCK].reshape(-1, 1)
+        counts += cv2.calcHist([block], [0], None, [256], [0, 256]).ravel().astype(np.int64)
+    return counts
+
+
+def pair_table(lengths, codes):
+    """code << 8 | length of every symbol pair, indexed by the pair read as a little-endian uint16
+
+    The table is explicitly little-endian ('<u8'), so the length is the
+    first byte of every entry on any host.
+    """
+    first, second = np.divmod(np.arange(1 << 16), 256)[::-1]
+    pair_codes = (codes[first] << lengths[second].astype(np.uint64)) | codes[second]
+    table = (pair_codes << np.uint64(8)) | (lengths[first] + lengths[second]).astype(np.uint64)
+    return table.astype('<u8')
+
+
+def encode_symbols(symbols):
+    """Huffman stream of a uint8 array: code lengths, lane offsets and packed bits
+
+    Neighbouring symbols are coded as one pair (at most 2 * MAX_CODE_LENGTH
+    bits) looked up in a 65536-entry table by the two bytes read as one
+    uint16, which halves the work of the bit packer. The total bit count
+    is known from the histogram, so the output words are allocated once and
+    the lookup, offset and packing passes run block by block while each
+    block's temporaries are still in cache.
+    """
+    symbols = np.ascontiguousarray(symbols).reshape(-1).view(np.uint8)
+    counts = byte_histogram(symbols)
+    count = len(symbols)
+    lane = _lane_size(count)
+    if count == 0:
+        return struct.pack('<QII', 0, lane, 0) + bytes(256)
+    lengths = code_lengths(counts)
+    codes = canonical_codes(lengths)
+    total = int(counts @ lengths)
+    table = pair_table(lengths, codes)
+    pairs = symbols[:count & ~1].view('<u2')
+    words = np.zeros((total + 31) // 32 + GUARD_WORDS, dtype=np.uint64)
+    # Blok sınırları şerit başlarına denk gelir
+    step = lane // 2
+    block = max(PACK_BLOCK // step, 1) * step
+    starts, base = [], 0
+    for begin in range(0, len(pairs), block):
+        entries = np.take(table, pairs[begin:begin + block])
+        # Tablo açıkça küçük endian: her girişin ilk baytı çiftin uzunluğu
+        pair_lengths = entries.view(np.uint8)[::8]
+        offsets = np.cumsum(pair_lengths, dtype=np.int64)
+        offsets -= pair_lengths
+        offsets += base
+        pack_into(words, entries >> np.uint64(8), pair_lengths, offsets)
+        # Her şeridin ilk sembolünün bit konumu: şeritler bağımsız çözülebilir
+        starts.append(offsets[::step])
+        base = int(offsets[-1]) + int(pair_lengths[-1])
+    if count % 2:
+        # Tek kalan son sembol ayrı yazılır (yeni bir şerit başlatabilir)
+        last = symbols[-1:]
+        pack_into(words, codes[last], lengths[last], np.array([base]))
+        if len(pairs) % step == 0:
+            starts.append(np.array([base]))
+    starts = np.concatenate(starts).astype('<u8')
+    return (struct.pack('<QII', count, lane, len(starts)) + lengths.astype(np.uint8).tobytes()
+            + starts.tobytes() + words.astype('>u4').tobytes())
+
+
+def decode_symbols(data, offset=0):
+    """Inverse of encode_symbols: the uint8 symbols stored at data[offset:]
+
+    All lanes advance together: each step peeks MAX_CODE_LENGTH bits at
+    every lane's position, looks the symbol and its length up in one table
+    and moves each lane forward by its own length.
+    """
+    count, lane, lanes = struct.unpack_from('<QII', data, offset)
+    offset += 16
+    lengths = np.frombuffer(data, dtype=np.uint8, count=256, offset=offset).astype(np.int64)
+    offset += 256
+    if count == 0:
+        return np.zeros(0, dtype=np.uint8)
+    positions = np.frombuffer(data, dtype='<u8', count=lanes, offset=offset).astype(np.int64)
+    offset += 8 * lanes
+    words = unpack_words(data[offset:])
+    symbols, sizes, width = decode_table(lengths, canonical_codes(lengths))
+
+    steps = min(lane, count)
+    output = np.empty((steps, lanes), dtype=np.uint8)
+    for step in range(steps):
+        pattern = peek(words, positions, width).astype(np.intp)
+        output[step] = symbols[pattern]
+        positions += sizes[pattern]
+    return output.T.reshape(-1)[:count]
+
+
+def compress_huffman(image, quality=None):
+    """Lossless canonical Huffman stream of a PIL image or ndarray (quality is unused)"""
+    array = np.ascontiguousarray(to_array(image))
+    return write_header(MAGIC, array) + encode_symbols(array)
+
+
+def decompress_huffman(data, like=None):
+    """Decode a compress_huffman stream to an ndarray (or a PIL image if like is one)"""
+    data = memoryview(data)
+    dtype, shape, offset = read_header(data, MAGIC)
+    array = decode_symbols(data, offset).view(dtype).reshape(shape)
+    return array if like is None else like_input(array, like)
+
+
+def benchmark(image, repeats=3):
+    """Compression ratio and encode/decode throughput (MB/s of raw pixels)"""
+    array = np.ascontiguousarray(to_array(image))
+    encode_time = decode_time = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        data = compress_huffman(array)
+        encode_time = min(encode_time, time.perf_counter() - start)
+        start = time.perf_counter()
+        decoded = decompress_huffman(data)
+        decode_time = min(decode_time, time.perf_counter() - start)
+    if not np.array_equal(decoded, array):
+        raise AssertionError("Huffman round trip changed the image")
+    megabytes = array.nbytes / 1e6
+    return {
+        'ratio': array.nbytes / len(data),
+        'bits_per_symbol': 8.0 * len(data) / array.nbytes,
+        'encode_mb_s': megabytes / encode_time,
+        'decode_mb_s': megabytes / decode_time,
+        'encode_s': encode_time,
+        'decode_s': decode_time,
+    }
+
+
+if __name__ == "__main__":
+    # Kullanım: python huffman.py resim.jpg
+    from PIL import Image
+    stats = benchmark(np.asarray(Image.open(sys.argv[1])))
+    print(" ".join(f"{name}={value:.3f}" for name, value in stats.items()))
@@ -0,0 +1,109 @@
+"""
+Session-scoped store of decoded uploads (decode once per upload)
+"""
+
+import io
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+import streamlit as st
+
+from histogram import get_histogram_index
+from result_cache import image_digest
+
+# Oturum başına bellekte tutulan çözülmüş görüntü sayısı
+MAX_SESSION_IMAGES = 2
+
+
+class DecodedImage:
+    """A decoded upload: read-only contiguous uint8 pixels plus metadata"""
+
+    def __init__(self, digest, array, mode):
+        self.digest = digest
+        self.array = array
+        self.mode = mode
+        self._pil = None
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    @property
+    def channels(self):
+        return 1 if self.array.ndim == 2 else self.array.shape[2]
+
+    @property
+    def pil(self):
+        """PIL image for legacy filter APIs, built once and reused"""
+        if self._pil is None:
+            self._pil = Image.fromarray(self.array, mode=self.mode)
+        return self._pil
+
+    @property
+    def histograms(self):
+        """Histogram index of the decoded pixels, built once per upload"""
+        return get_histogram_index(self.array, self.digest)
+
+    def view(self):
+        """Return a read-only view of the pixel buffer"""
+        view = self.array.view()
+        view.flags.writeable = False
+        return view
+
+
+def decode_image(data):
+    """Decode encoded image bytes into a DecodedImage keyed by its pixel digest
+
+    The key is result_cache.image_digest of the decoded array, so the
+    store, the result cache and the per-image caches share one key space.
+    """
+    image = Image.open(io.BytesIO(data))
+    # RGBA / palet / CMYK görüntüleri RGB'ye çevir
+    if image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    array = np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+    array.flags.writeable = False
+    return DecodedImage(image_digest(array), array, image.mode)
+
+
+def _get_store():
+    if 'image_store' not in st.session_state:
+        st.session_state.image_store = OrderedDict()
+        st.session_state.upload_digests = {}
+    return st.session_state.image_store
+
+
+def store_upload(uploaded_file):
+    """Decode an UploadedFile once and return its store key"""
+    store = _get_store()
+    file_id = getattr(uploaded_file, 'file_id', None)
+    digest = st.session_state.upload_digests.get(file_id) if file_id else None
+
+    if digest is None or digest not in store:
+        # Aynı dosya yeniden çalıştırmalarda çözülmez (file_id -> digest)
+        decoded = decode_image(uploaded_file.getvalue())
+        digest = decoded.digest
+        # Aynı pikseller farklı bir yüklemeden geldiyse mevcut kayıt kullanılır
+        store.setdefault(digest, decoded)
+        if file_id:
+            st.session_state.upload_digests = {file_id: digest}
+
+    store.move_to_end(digest)
+    while len(store) > MAX_SESSION_IMAGES:
+        store.popitem(last=False)
+    return digest
+
+
+def get_image(digest):
+    """Return the DecodedImage stored under digest, or None"""
+    if digest is None:
+        return None
+    return _get_store().get(digest)
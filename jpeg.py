@@ -0,0 +1,335 @@
+"""
+JPEG codec and one-pass rate-distortion analysis from cached blockwise DCT statistics
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+from result_cache import image_digest
+from huffman import code_lengths
+from wavelet_codec import RGB_TO_YCC, YCC_TO_RGB
+
+QUALITIES = tuple(range(1, 101))
+# Bloklar bu sayıdan fazlaysa AC istatistikleri rastgele bir örneklemden kestirilir
+MAX_SAMPLE_BLOCKS = 4096
+# Kestirilen boyutlar bu kalitedeki gerçek kodlamaya göre ölçeklenir
+CALIBRATION_QUALITY = 75
+# Eğri bu kalitelerde tam kestirilir, aradakiler log(1 + ölçek) üzerinde ara değerlenir
+# (90 üstünde tablolar 1'e kırpıldığından her kalite ayrı kestirilir)
+CURVE_KNOTS = (1, 2, 3, 5, 7, 10, 15, 20, 25, 30, 40, 50, 60, 70, 75, 80, 85, 88) + tuple(range(90, 101))
+# Alt örnekleme hatası bu yükseklikte, her SUBSAMPLING_STRIDE satırda bir alınan bantlardan ölçülür
+SUBSAMPLING_BAND = 16
+SUBSAMPLING_STRIDE = 128
+# Bütçe aramasında eğriye göre yönlendirilen en fazla kodlama (sonrası ikiye bölme)
+MAX_GUIDED_ENCODES = 3
+MAX_CACHED_ANALYSES = 4
+# Blok SSIM sabitleri (8 bit)
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+# ITU T.81 Ek K temel niceleme tabloları
+LUMA_TABLE = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+], dtype=np.float64).reshape(8, 8)
+CHROMA_TABLE = np.array([
+    17, 18, 24, 47, 99, 99, 99, 99, 18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99, 47, 66, 99, 99, 99, 99, 99, 99,
+] + [99] * 32, dtype=np.float64).reshape(8, 8)
+
+
+def _zigzag():
+    order = sorted(((y, x) for y in range(8) for x in range(8)),
+                   key=lambda p: (p[0] + p[1], p[1] if (p[0] + p[1]) % 2 == 0 else p[0]))
+    return np.array([y * 8 + x for y, x in order])
+
+
+ZIGZAG = _zigzag()
+# Ortonormal 8x8 DCT-II matrisi
+DCT = np.array([[np.sqrt((1 if k == 0 else 2) / 8.0) * np.cos((2 * n + 1) * k * np.pi / 16)
+                 for n in range(8)] for k in range(8)], dtype=np.float32)
+
+_analyses = OrderedDict()
+_analyses_lock = threading.Lock()
+
+
+def quant_table(base, quality):
+    """IJG scaling of a base table to quality 1-100 (as libjpeg, baseline clamp)"""
+    return np.clip(np.floor((base * quality_scale(quality) + 50) / 100), 1, 255)
+
+
+def quality_scale(quality):
+    """IJG table scale factor (percent) of quality 1-100"""
+    quality = int(np.clip(quality, 1, 100))
+    return 5000 / quality if quality < 50 else 200 - 2 * quality
+
+
+def _block_view(plane):
+    """(rows, 8, cols, 8) view of a plane edge padded to whole 8x8 blocks"""
+    height, width = plane.shape
+    padded = np.pad(plane, ((0, -height % 8), (0, -width % 8)), mode='edge')
+    return padded.reshape(padded.shape[0] // 8, 8, padded.shape[1] // 8, 8)
+
+
+def _bit_length(values):
+    """JPEG magnitude category of integers (bits of |v|), vectorized"""
+    return np.frexp(np.abs(values).astype(np.float64))[1]
+
+
+class _Component:
+    """DC and zigzag DCT coefficients of a block sample, with each block's DC predecessor"""
+
+    def __init__(self, plane, rng):
+        view = _block_view(plane)
+        rows, cols = view.shape[0], view.shape[2]
+        self.count = rows * cols
+        if self.count > MAX_SAMPLE_BLOCKS:
+            self.sample = np.sort(rng.choice(self.count, MAX_SAMPLE_BLOCKS, replace=False))
+        else:
+            self.sample = np.arange(self.count)
+        # Ortonormal DCT'de DC = blok toplamı / 8; DC farkı raster sırasındaki önceki bloğa göre
+        block_rows, block_cols = np.divmod(np.concatenate([self.sample, self.sample - 1]), cols)
+        sums = view[block_rows, :, block_cols, :].sum(axis=(1, 2), dtype=np.float64) / 8.0
+        self.dc = sums[:len(self.sample)]
+        self.dc_previous = np.where(self.sample > 0, sums[len(self.sample):], 0.0)
+        sampled = view[block_rows[:len(self.sample)], :, block_cols[:len(self.sample)], :].astype(np.float32)
+        coefficients = (DCT @ sampled @ DCT.T).reshape(-1, 64)
+        self.ac = np.ascontiguousarray(coefficients[:, ZIGZAG[1:]])
+        self.weight = self.count / len(self.sample)
+
+
+def _subsampling_mse(plane):
+    """Error of 4:2:0 chroma (area down, bilinear up as libjpeg) on row bands of plane"""
+    height = plane.shape[0]
+    starts = range(0, max(height - SUBSAMPLING_BAND, 0) + 1, SUBSAMPLING_STRIDE)
+    errors = []
+    for start in starts:
+        band = plane[start:start + SUBSAMPLING_BAND]
+        half = cv2.resize(band, ((band.shape[1] + 1) // 2, (band.shape[0] + 1) // 2), interpolation=cv2.INTER_AREA)
+        errors.append(cv2.norm(band, cv2.resize(half, band.shape[::-1], interpolation=cv2.INTER_LINEAR),
+                               cv2.NORM_L2SQR) / band.size)
+    return float(np.mean(errors))
+
+
+class JpegAnalysis:
+    """Color transform and blockwise DCT of a block sample of one image, computed once
+
+    Every quality then only requantizes cached coefficients: the quantized
+    DC and AC terms of a random block sample give the symbol statistics,
+    the squared error (Parseval) and an 8x8 block SSIM of luma. The
+    estimates of the whole quality range are kept with the analysis.
+    """
+
+    def __init__(self, array):
+        rng = np.random.default_rng(0)
+        color = array.ndim == 3 and array.shape[2] >= 3
+        if color:
+            source = np.ascontiguousarray(array[:, :, :3])
+            ycc = cv2.transform(source.astype(np.float32), RGB_TO_YCC)
+            luma = ycc[:, :, 0] - np.float32(128)
+            chroma = [ycc[:, :, c] for c in (1, 2)]
+            halves = [cv2.resize(plane, ((plane.shape[1] + 1) // 2, (plane.shape[0] + 1) // 2),
+                                 interpolation=cv2.INTER_AREA) for plane in chroma]
+            # 4:2:0 alt örneklemenin kendi hatası kaliteye bağlı değil
+            self.subsampling_mse = [_subsampling_mse(plane) for plane in chroma]
+            planes = [luma] + halves
+        else:
+            source = array if array.ndim == 2 else np.ascontiguousarray(array[:, :, 0])
+            planes = [source.astype(np.float32) - np.float32(128)]
+            self.subsampling_mse = []
+        self.color = color
+        self.components = [_Component(plane, rng) for plane in planes]
+        self._estimates = {}
+        self._curve = None
+        # Tek bir gerçek kodlama boyut ve hata kestirimlerini ölçekler
+        self.scale = self.mse_scale = 1.0
+        data = encode_jpeg(source, CALIBRATION_QUALITY)
+        size, modelled, _ = self.estimate(CALIBRATION_QUALITY)
+        measured = cv2.norm(decompress_jpeg(data), source, cv2.NORM_L2SQR) / source.size
+        self.scale = len(data) / size
+        self.mse_scale = max(measured, 1e-3) / (255.0 ** 2 / 10.0 ** (modelled / 10.0))
+        self._estimates.clear()
+
+    def _tables(self, quality):
+        luma = quant_table(LUMA_TABLE, quality).ravel()[ZIGZAG]
+        chroma = quant_table(CHROMA_TABLE, quality).ravel()[ZIGZAG]
+        return [luma] + [chroma] * (len(self.components) - 1)
+
+    def estimate(self, quality):
+        """(estimated bytes, PSNR dB, luma block SSIM) of one quality"""
+        if quality in self._estimates:
+            return self._estimates[quality]
+        tables = self._tables(quality)
+        dc_counts = [np.zeros(256), np.zeros(256)]
+        ac_counts = [np.zeros(256), np.zeros(256)]
+        extra_bits = 0.0
+        errors = []
+        ssim = None
+        for index, (component, table) in enumerate(zip(self.components, tables)):
+            group = min(index, 1)
+            dc = np.rint(component.dc / table[0])
+            categories = _bit_length(dc - np.rint(component.dc_previous / table[0]))
+            dc_counts[group] += np.bincount(categories, minlength=256) * component.weight
+            extra_bits += categories.sum() * component.weight
+
+            ac = np.rint(component.ac / table[1:].astype(np.float32))
+            nonzero = ac != 0
+            flat = np.flatnonzero(nonzero)
+            block, position = np.divmod(flat, 63)
+            previous = np.concatenate([[-1], position[:-1]])
+            previous[np.concatenate([[True], block[1:] != block[:-1]])] = -1
+            run = position - previous - 1
+            sizes = _bit_length(ac[nonzero])
+            symbols = (run % 16) * 16 + sizes
+            counts = np.bincount(symbols, minlength=256).astype(np.float64)
+            counts[0xF0] += (run // 16).sum()
+            # Son katsayı sıfırsa blok EOB ile biter
+            counts[0x00] += len(component.ac) - np.count_nonzero(nonzero[:, -1])
+            ac_counts[group] += counts * component.weight
+            extra_bits += sizes.sum() * component.weight
+
+            dc_error = ((component.dc - dc * table[0]) ** 2).sum()
+            reconstructed = ac * table[1:].astype(np.float32)
+            ac_error = float(np.square(component.ac - reconstructed).sum(dtype=np.float64))
+            errors.append((dc_error + ac_error) / (64 * len(component.sample)))
+            if index == 0:
+                ssim = self._block_ssim(component, dc * table[0], reconstructed)
+
+        bits = extra_bits
+        for counts in dc_counts + ac_counts:
+            if counts.any():
+                bits += (counts * code_lengths(np.ceil(counts).astype(np.int64))).sum()
+        size = bits / 8.0 * self.scale
+        self._estimates[quality] = result = (size, self._psnr(errors), ssim)
+        return result
+
+    def _block_ssim(self, component, dc, reconstructed):
+        mean_x = component.dc / 8.0 + 128.0
+        mean_y = dc / 8.0 + 128.0
+        var_x = np.einsum('ij,ij->i', component.ac, component.ac, dtype=np.float64) / 64.0
+        var_y = np.einsum('ij,ij->i', reconstructed, reconstructed, dtype=np.float64) / 64.0
+        covariance = np.einsum('ij,ij->i', component.ac, reconstructed, dtype=np.float64) / 64.0
+        ssim = (((2 * mean_x * mean_y + SSIM_C1) * (2 * covariance + SSIM_C2))
+                / ((mean_x ** 2 + mean_y ** 2 + SSIM_C1) * (var_x + var_y + SSIM_C2)))
+        return float(ssim.mean())
+
+    def _psnr(self, errors):
+        """RGB PSNR from per-component squared errors
+
+        The errors are combined as if uncorrelated, which overestimates the
+        RGB error by a roughly constant factor; mse_scale removes it.
+        """
+        # Çıkışın 8 bite yuvarlanması kanal başına ~1/12 ekler
+        if self.color:
+            # libjpeg YCbCr'yi DCT'den önce 8 bite yuvarlar: bileşen başına ~1/12 daha
+            luma = errors[0] + 1.0 / 12.0
+            chroma = [e + s + 1.0 / 12.0 for e, s in zip(errors[1:], self.subsampling_mse)]
+            weights = (YCC_TO_RGB.astype(np.float64) ** 2).mean(axis=0)
+            mse = weights[0] * luma + weights[1] * chroma[0] + weights[2] * chroma[1] + 1.0 / 12.0
+        else:
+            mse = errors[0] + 1.0 / 12.0
+        return float(10.0 * np.log10(255.0 ** 2 / (mse * self.mse_scale)))
+
+    def curve(self, qualities=QUALITIES):
+        """[(quality, estimated bytes, PSNR dB, block SSIM)] for every quality
+
+        Only CURVE_KNOTS are estimated; the qualities between them are
+        interpolated against log(1 + table scale), with which log bytes,
+        PSNR and SSIM vary almost linearly. Built once per analysis.
+        """
+        if self._curve is None:
+            knots = [(np.log1p(quality_scale(quality)),) + self.estimate(quality) for quality in CURVE_KNOTS]
+            # np.interp artan x ister; ölçek kaliteyle azalır
+            x, sizes, psnrs, ssims = (np.array(column) for column in zip(*knots[::-1]))
+            scales = np.log1p([quality_scale(quality) for quality in QUALITIES])
+            self._curve = list(zip(QUALITIES, np.exp(np.interp(scales, x, np.log(sizes))).tolist(),
+                                   np.interp(scales, x, psnrs).tolist(), np.interp(scales, x, ssims).tolist()))
+        return [self._curve[int(np.clip(quality, 1, 100)) - 1] for quality in qualities]
+
+
+def get_analysis(image, image_key=None):
+    """Return the cached JPEG analysis of image"""
+    array = to_array(image)
+    if image_key is None:
+        image_key = image_digest(array)
+    with _analyses_lock:
+        analysis = _analyses.get(image_key)
+        if analysis is not None:
+            _analyses.move_to_end(image_key)
+            return analysis
+    analysis = JpegAnalysis(array)
+    with _analyses_lock:
+        _analyses[image_key] = analysis
+        while len(_analyses) > MAX_CACHED_ANALYSES:
+            _analyses.popitem(last=False)
+    return analysis
+
+
+def encode_jpeg(array, quality):
+    """Baseline JPEG bytes (libjpeg, 4:2:0, optimized Huffman tables) of an RGB or gray ndarray"""
+    if array.ndim == 3 and array.shape[2] >= 3:
+        array = cv2.cvtColor(np.ascontiguousarray(array[:, :, :3]), cv2.COLOR_RGB2BGR)
+    ok, data = cv2.imencode('.jpg', array, [cv2.IMWRITE_JPEG_QUALITY, int(np.clip(quality, 1, 100)),
+                                            cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return data.tobytes()
+
+
+def rate_distortion_curve(image, qualities=QUALITIES, image_key=None):
+    """Estimated size, PSNR and block SSIM for every quality from one analysis"""
+    return get_analysis(image, image_key).curve(qualities)
+
+
+def quality_for_budget(image, max_bytes, image_key=None):
+    """Highest quality whose JPEG fits max_bytes: (quality, encoded bytes)
+
+    Each real encode corrects the estimated curve by its measured/estimated
+    size ratio, and the next quality is read from the corrected curve
+    inside the bracket found so far; usually two encodes settle it. After
+    MAX_GUIDED_ENCODES the bracket is bisected, so a bad estimate costs at
+    most MAX_GUIDED_ENCODES + log2(100) encodes.
+    """
+    array = to_array(image)
+    curve = rate_distortion_curve(array, image_key=image_key)
+    sizes = np.array([size for _, size, _, _ in curve])
+    # lowest: sığan en yüksek kalite (0: yok), highest: sığmayan en düşük kalite
+    lowest, highest, encoded = 0, 101, {}
+    ratio = 1.0
+    while highest - lowest > 1:
+        if len(encoded) < MAX_GUIDED_ENCODES:
+            probe = int(np.searchsorted(sizes * ratio, max_bytes, side='right'))
+            if probe <= lowest:
+                probe = lowest + 1
+            elif probe >= highest:
+                probe = highest - 1
+        else:
+            probe = (lowest + highest) // 2
+        encoded[probe] = encode_jpeg(array, probe)
+        ratio = len(encoded[probe]) / sizes[probe - 1]
+        if len(encoded[probe]) <= max_bytes:
+            lowest = probe
+        else:
+            highest = probe
+    if not lowest:
+        # Kalite 1 bile sığmıyor: en küçük akış döndürülür
+        return 1, encoded[1]
+    return lowest, encoded[lowest]
+
+
+def compress_jpeg(image, quality=80):
+    """JPEG bytes of a PIL image or ndarray"""
+    return encode_jpeg(np.asarray(to_array(image)), quality)
+
+
+def decompress_jpeg(data, like=None):
+    """Decode JPEG bytes to an RGB (or gray) ndarray, or a PIL image if like is one"""
+    decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if decoded.ndim == 3:
+        decoded = cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+    return decoded if like is None else like_input(decoded, like)
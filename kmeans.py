@@ -0,0 +1,184 @@
+"""
+K-means color segmentation on a weighted, reduced color set
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from arrays import to_array, like_input
+from result_cache import image_digest
+from histogram import get_histogram_index
+
+# Bu sayıdan az farklı renk varsa renkler tam olarak kullanılır,
+# fazlası (fotoğraflar) 15 bitlik nicemlenmiş 3B histograma indirgenir
+UNIQUE_COLOR_LIMIT = 65536
+HISTOGRAM_BITS = 5
+BATCH_SIZE = 4096
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-3
+MAX_CACHED_IMAGES = 4
+
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def _pack(array):
+    """Pack pixels into integer color keys (24-bit RGB or 8-bit gray)"""
+    if array.ndim == 2:
+        return array.ravel().astype(np.uint32), 8
+    pixels = array.reshape(-1, array.shape[2]).astype(np.uint32)
+    return (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2], 24
+
+
+def _unpack(keys, bits):
+    if bits == 8:
+        return keys.astype(np.float32)[:, None]
+    return np.stack([(keys >> 16) & 255, (keys >> 8) & 255, keys & 255], axis=1).astype(np.float32)
+
+
+def reduce_colors(array, image_key=None):
+    """Collapse an image to weighted representative colors
+
+    Returns (pixel_groups, colors, weights): for every pixel the index of
+    its reduced color, the reduced colors and their pixel counts.
+    """
+    keys, bits = _pack(array)
+    # Renk sayımları görüntünün paylaşılan ortak histogramından gelir
+    present, counts = get_histogram_index(array, image_key).joint(array)
+
+    groups = np.full(1 << bits, -1, dtype=np.int32)
+    if len(present) <= UNIQUE_COLOR_LIMIT or bits == 8:
+        # Az renkli görüntü: her benzersiz renk, kaç kez geçtiği ağırlığıyla
+        groups[present] = np.arange(len(present), dtype=np.int32)
+        return groups[keys], _unpack(present, bits), counts.astype(np.float64)
+
+    # Fotoğraf: 5 bit/kanal histogram kutuları, kutu içindeki ağırlıklı ortalama renk
+    shift = 8 - HISTOGRAM_BITS
+    present_colors = _unpack(present, bits)
+    q = present_colors.astype(np.uint32) >> shift
+    bins = (q[:, 0] << (2 * HISTOGRAM_BITS)) | (q[:, 1] << HISTOGRAM_BITS) | q[:, 2]
+    used, bin_index = np.unique(bins, return_inverse=True)
+    weights = np.bincount(bin_index, weights=counts).astype(np.float64)
+    colors = np.stack([
+        np.bincount(bin_index, weights=counts * present_colors[:, c]) for c in range(3)
+    ], axis=1) / weights[:, None]
+    groups[present] = bin_index.astype(np.int32)
+    return groups[keys], colors.astype(np.float32), weights
+
+
+def _nearest(points, centers):
+    """Index of the nearest center for each point (squared Euclidean)"""
+    distances = (np.einsum('ij,ij->i', points, points)[:, None]
+                 - 2.0 * points @ centers.T
+                 + np.einsum('ij,ij->i', centers, centers)[None, :])
+    return np.argmin(distances, axis=1), distances
+
+
+def _kmeans_plus_plus(points, weights, k, rng, initial=None):
+    """Weighted k-means++ seeding, optionally extending existing centers"""
+    centers = [] if initial is None else [c for c in initial]
+    if not centers:
+        centers.append(points[rng.choice(len(points), p=weights / weights.sum())])
+    closest = _nearest(points, np.asarray(centers, dtype=np.float32))[1].min(axis=1)
+    while len(centers) < k:
+        score = weights * np.maximum(closest, 0)
+        total = score.sum()
+        if total <= 0:
+            break
+        center = points[rng.choice(len(points), p=score / total)]
+        centers.append(center)
+        closest = np.minimum(closest, ((points - center) ** 2).sum(axis=1))
+    return np.asarray(centers, dtype=np.float32)
+
+
+def minibatch_kmeans(points, weights, k, initial=None, seed=0):
+    """Weighted mini-batch k-means (Sculley 2010) on the reduced color set"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(points))
+    centers = _kmeans_plus_plus(points, weights, k, rng, initial)
+    k = len(centers)
+    # Ağırlıkla orantılı örnekleme için birikimli dağılım (bir kez)
+    cdf = np.cumsum(weights)
+    seen = np.zeros(k, dtype=np.float64)
+    batch = min(BATCH_SIZE, len(points))
+
+    for _ in range(MAX_ITERATIONS):
+        sample = points[np.searchsorted(cdf, rng.random(batch) * cdf[-1], side='right').clip(max=len(points) - 1)]
+        labels, _ = _nearest(sample, centers)
+        hits = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = np.stack([np.bincount(labels, weights=sample[:, c], minlength=k)
+                         for c in range(points.shape[1])], axis=1)
+        active = hits > 0
+        seen[active] += hits[active]
+        rate = np.zeros(k)
+        rate[active] = hits[active] / seen[active]
+        means = np.zeros_like(sums)
+        means[active] = sums[active] / hits[active, None]
+        updated = centers + (rate[:, None] * (means - centers)).astype(np.float32)
+        shift = np.abs(updated - centers).max()
+        centers = updated
+        if shift < TOLERANCE:
+            break
+
+    # Son bir tam ağırlıklı Lloyd adımı (indirgenmiş küme küçük, ucuz)
+    labels, _ = _nearest(points, centers)
+    totals = np.bincount(labels, weights=weights, minlength=k)
+    for c in range(points.shape[1]):
+        column = np.bincount(labels, weights=weights * points[:, c], minlength=k)
+        filled = totals > 0
+        centers[filled, c] = column[filled] / totals[filled]
+    return centers, totals
+
+
+def _model(array, image_key):
+    if image_key is None:
+        image_key = image_digest(array)
+    with _models_lock:
+        model = _models.get(image_key)
+        if model is not None:
+            _models.move_to_end(image_key)
+            return model
+    pixel_groups, colors, weights = reduce_colors(array, image_key)
+    model = {'pixel_groups': pixel_groups, 'colors': colors, 'weights': weights, 'centers': {}}
+    with _models_lock:
+        _models[image_key] = model
+        while len(_models) > MAX_CACHED_IMAGES:
+            _models.popitem(last=False)
+    return model
+
+
+def _centers(model, k):
+    """Cluster centers of the image's reduced colors for k, fixed per (image, k)
+
+    K = 1 starts from weighted k-means++ alone; every larger K warm-starts
+    from the centers of K - 1 plus one k-means++ center, with a seed
+    derived from K. The chain is computed (and cached) up from the largest
+    K already known, so a slider step runs one warm clustering, yet the
+    result never depends on which K values were run before.
+    """
+    with _models_lock:
+        known = dict(model['centers'])
+    if k in known:
+        return known[k][0]
+    previous = max((other for other in known if other < k), default=0)
+    initial = known[previous][0] if previous in known else None
+    for step in range(previous + 1, k + 1):
+        centers, totals = minibatch_kmeans(model['colors'], model['weights'], step, initial, seed=step)
+        with _models_lock:
+            model['centers'][step] = (centers, totals)
+        initial = centers
+    return initial
+
+
+def kmeans_segmentation(image, k, image_key=None):
+    """Paint every pixel with its cluster's mean color"""
+    array = to_array(image)
+    model = _model(array, image_key)
+    centers = _centers(model, max(int(k), 1))
+
+    # Palet araması: indirgenmiş renk -> küme -> renk, tek bir toplama geçişi
+    color_labels, _ = _nearest(model['colors'], centers)
+    palette = np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+    result = palette[color_labels][model['pixel_groups']].reshape(array.shape)
+    return like_input(result, image)
@@ -123,6 +123,9 @@ TRANSLATIONS = {
         'wavelet': 'Wavelet',
         'rle': 'Run Length Encoding',
         'huffman': 'Huffman Coding',
+        'rans': 'rANS Coding',
+        'loco': 'LOCO-I (JPEG-LS) Lossless',
+        'png': 'PNG',
         'rgb': 'RGB',
         'hsv': 'HSV',
         'lab': 'LAB',
@@ -140,6 +143,7 @@ TRANSLATIONS = {
         'result': '📊 Result',
         'download': '💾 Download',
         'download_button': 'Download Processed Image',
+        'download_format': 'File Format',
         'uploaded_image': '📷 Uploaded Image',
         'filter_settings': '🔧 Filter Settings',
         'tip': '💡 Tip',
@@ -186,6 +190,26 @@ TRANSLATIONS = {
         'lower_threshold': 'Lower Threshold',
         'upper_threshold': 'Upper Threshold',
         'clusters': 'Clusters',
+        'processing': '⏳ Processing...',
+        'filter_profile': 'Filter Profile',
+        'ideal': 'Ideal',
+        'butterworth': 'Butterworth',
+        'niblack': 'Niblack',
+        'sauvola': 'Sauvola',
+        'block_size': 'Block Size',
+        'threshold_classes': 'Classes',
+        'morph_gradient': 'Gradient',
+        'object_outline': 'Object outlines',
+        'bilateral_grid': 'Bilateral (Fast Grid)',
+        'grid_quality': 'Grid Quality',
+        'guided_filter': 'Guided Filter',
+        'guided_radius': 'Radius',
+        'guided_eps': 'Smoothing (eps)',
+        'guide_image': 'Guide',
+        'guide_self': 'Self (per channel)',
+        'guide_luma': 'Luminance (cross)',
+        'guided_subsample': 'Subsampling',
+        'guided_tip': 'Guided filter smooths regions with variance below eps and keeps stronger edges; its cost does not depend on the radius',
     },
     
     'tr': {
@@ -308,6 +332,9 @@ TRANSLATIONS = {
         'wavelet': 'Wavelet',
         'rle': 'Uzunluk Kodlama',
         'huffman': 'Huffman Kodlama',
+        'rans': 'rANS Kodlama',
+        'loco': 'LOCO-I (JPEG-LS) Kayıpsız',
+        'png': 'PNG',
         'rgb': 'RGB',
         'hsv': 'HSV',
         'lab': 'LAB',
@@ -325,6 +352,7 @@ TRANSLATIONS = {
         'result': '📊 Sonuç',
         'download': '💾 İndir',
         'download_button': 'İşlenmiş Görüntüyü İndir',
+        'download_format': 'Dosya Biçimi',
         'uploaded_image': '📷 Yüklenen Görüntü',
         'filter_settings': '🔧 Filtre Ayarları',
         'tip': '💡 İpucu',
@@ -371,6 +399,26 @@ TRANSLATIONS = {
         'lower_threshold': 'Alt Eşik',
         'upper_threshold': 'Üst Eşik',
         'clusters': 'Kümeler',
+        'processing': '⏳ İşleniyor...',
+        'filter_profile': 'Filtre Profili',
+        'ideal': 'İdeal',
+        'butterworth': 'Butterworth',
+        'niblack': 'Niblack',
+        'sauvola': 'Sauvola',
+        'block_size': 'Blok Boyutu',
+        'threshold_classes': 'Sınıf Sayısı',
+        'morph_gradient': 'Gradyan',
+        'object_outline': 'Nesne sınırları',
+        'bilateral_grid': 'Bilateral (Hızlı Izgara)',
+        'grid_quality': 'Izgara Kalitesi',
+        'guided_filter': 'Yönlendirilmiş Filtre',
+        'guided_radius': 'Yarıçap',
+        'guided_eps': 'Düzgünleştirme (eps)',
+        'guide_image': 'Kılavuz',
+        'guide_self': 'Kendisi (kanal başına)',
+        'guide_luma': 'Parlaklık (çapraz)',
+        'guided_subsample': 'Alt Örnekleme',
+        'guided_tip': 'Yönlendirilmiş filtre varyansı eps\'ten küçük bölgeleri düzleştirir, güçlü kenarları korur; maliyeti yarıçapa bağlı değildir',
     }
 }
 
@@ -0,0 +1,184 @@
+"""
+Morphology engine: SE decomposition, iteration folding and van Herk/Gil-Werman lines
+"""
+
+from functools import lru_cache
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+
+MORPH_SHAPES = {
+    'rect': cv2.MORPH_RECT,
+    'ellipse': cv2.MORPH_ELLIPSE,
+    'cross': cv2.MORPH_CROSS,
+}
+
+OPERATIONS = ('erosion', 'dilation', 'opening', 'closing', 'gradient')
+
+# İndirgeyici -> (NumPy ufunc'u, OpenCV işlemi)
+REDUCERS = {
+    'min': (np.minimum, cv2.erode),
+    'max': (np.maximum, cv2.dilate),
+}
+
+# Bu uzunluktan itibaren van Herk/Gil-Werman, OpenCV'nin doğrusal maliyetli
+# satır filtresinden hızlı (12 MP gri görüntüde ~600 piksel civarı)
+VAN_HERK_MIN_LENGTH = 512
+# Bu boyuttan küçük elipslerde OpenCV'nin doğrudan filtresi ayrıştırmadan hızlı
+ELLIPSE_DECOMPOSE_MIN_KERNEL = 41
+
+
+@lru_cache(maxsize=32)
+def decompose(shape, kernel_size):
+    """Split a structuring element into rectangles whose union is exactly the SE
+
+    Returns ((top, bottom, left, right), ...) offsets relative to the anchor.
+    Each row of rect, ellipse and cross elements is one run, and the rows
+    whose run contains a given run form a vertical band, so every distinct
+    run gives one rectangle.
+    """
+    mask = cv2.getStructuringElement(MORPH_SHAPES[shape], (kernel_size, kernel_size)).astype(bool)
+    anchor = kernel_size // 2
+    runs = []
+    for row in mask:
+        columns = np.flatnonzero(row)
+        runs.append((columns[0], columns[-1]) if len(columns) else None)
+
+    rects = []
+    for run in sorted(set(r for r in runs if r is not None)):
+        band = [i for i, other in enumerate(runs) if other is not None and other[0] <= run[0] and other[1] >= run[1]]
+        # Bant bitişik değilse bitişik parçalara bölünür
+        start = band[0]
+        for previous, current in zip(band, band[1:] + [None]):
+            if current != previous + 1:
+                rects.append((anchor - start, previous - anchor, anchor - run[0], run[1] - anchor))
+                if current is not None:
+                    start = current
+    # Başka bir dikdörtgenin içinde kalanlar gereksiz
+    return tuple(rect for rect in rects
+                 if not any(other != rect and all(o >= r for o, r in zip(other, rect)) for other in rects))
+
+
+def _border(array, reducer):
+    info = np.iinfo(array.dtype) if np.issubdtype(array.dtype, np.integer) else np.finfo(array.dtype)
+    return info.max if reducer == 'min' else info.min
+
+
+def _van_herk(array, before, after, axis, reducer):
+    """Running min/max over [i - before, i + after] along axis, O(1) per pixel
+
+    The axis is cut into blocks of the window size; every window spans at
+    most two blocks, so it is the combination of a backward running extreme
+    in the first block and a forward running extreme in the second.
+    """
+    ufunc = REDUCERS[reducer][0]
+    size = before + after + 1
+    length = array.shape[axis]
+    blocks = -(-(length + size - 1) // size)
+    padding = [(0, 0)] * array.ndim
+    padding[axis] = (before, blocks * size - before - length)
+    padded = np.pad(array, padding, constant_values=_border(array, reducer))
+    padded = padded.reshape(array.shape[:axis] + (blocks, size) + array.shape[axis + 1:])
+
+    forward = ufunc.accumulate(padded, axis=axis + 1)
+    backward = np.flip(ufunc.accumulate(np.flip(padded, axis + 1), axis=axis + 1), axis + 1)
+    flat = array.shape[:axis] + (-1,) + array.shape[axis + 1:]
+    forward, backward = forward.reshape(flat), backward.reshape(flat)
+    head = [slice(None)] * array.ndim
+    tail = [slice(None)] * array.ndim
+    head[axis] = slice(0, length)
+    tail[axis] = slice(size - 1, size - 1 + length)
+    return ufunc(backward[tuple(head)], forward[tuple(tail)])
+
+
+def _line(array, before, after, axis, reducer):
+    """Erode/dilate with a line SE along axis (0: vertical, 1: horizontal)"""
+    size = before + after + 1
+    if size == 1:
+        return array
+    if size >= VAN_HERK_MIN_LENGTH:
+        return _van_herk(array, before, after, axis, reducer)
+    kernel = np.ones((1, size) if axis == 1 else (size, 1), dtype=np.uint8)
+    anchor = (before, 0) if axis == 1 else (0, before)
+    return REDUCERS[reducer][1](array, kernel, anchor=anchor)
+
+
+def _rect(array, rect, reducer):
+    """Erode/dilate with a rectangle given as anchor offsets"""
+    top, bottom, left, right = rect
+    if max(top + bottom, left + right) + 1 < VAN_HERK_MIN_LENGTH:
+        # OpenCV dikdörtgeni kendi içinde iki doğrusal geçişe ayırır
+        kernel = np.ones((top + bottom + 1, left + right + 1), dtype=np.uint8)
+        return REDUCERS[reducer][1](array, kernel, anchor=(left, top))
+    return _line(_line(array, left, right, 1, reducer), top, bottom, 0, reducer)
+
+
+def _extremes(array, rects, reducers):
+    """Erosion and/or dilation by the union of rects in one traversal
+
+    The reducers share the walk over the decomposition and each rectangle's
+    input reads.
+    """
+    results = {}
+    for rect in rects:
+        for reducer in reducers:
+            part = _rect(array, rect, reducer)
+            if reducer in results:
+                REDUCERS[reducer][0](results[reducer], part, out=results[reducer])
+            else:
+                results[reducer] = np.array(part) if part is array else part
+    return [results[reducer] for reducer in reducers]
+
+
+def _fold(shape, kernel_size, iterations):
+    """One SE equivalent to iterations passes, when the Minkowski sum is exact"""
+    if shape == 'rect' and kernel_size % 2:
+        # n kez k x k dikdörtgen = tek bir n(k-1)+1 dikdörtgen (merkezli çapa)
+        return kernel_size + (kernel_size - 1) * (iterations - 1), 1
+    return kernel_size, iterations
+
+
+def morphology(image, operation, kernel_shape='rect', kernel_size=5, iterations=1):
+    """Erosion, dilation, opening, closing or gradient of a PIL image or ndarray
+
+    Structuring elements run as unions of rectangles and every rectangle as
+    two line passes, so the cost per pixel grows with the number of
+    distinct rows of the SE, not its area; very long lines switch to the
+    constant-cost van Herk/Gil-Werman pass. Rectangle iterations are folded
+    into one larger rectangle. The gradient gets erosion and dilation from
+    one traversal. Border pixels are ignored, as in cv2.erode/cv2.dilate,
+    and results are identical to cv2.morphologyEx.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown morphological operation: {operation}")
+    if kernel_shape not in MORPH_SHAPES:
+        raise ValueError(f"Unknown kernel shape: {kernel_shape}")
+    array = to_array(image)
+    kernel_size, repeat = _fold(kernel_shape, int(kernel_size), max(1, int(iterations)))
+
+    if kernel_shape == 'ellipse' and kernel_size < ELLIPSE_DECOMPOSE_MIN_KERNEL:
+        kernel = cv2.getStructuringElement(MORPH_SHAPES[kernel_shape], (kernel_size, kernel_size))
+        passes = lambda data, reducers: [REDUCERS[reducer][1](data, kernel) for reducer in reducers]
+    else:
+        rects = decompose(kernel_shape, kernel_size)
+        passes = lambda data, reducers: _extremes(data, rects, reducers)
+
+    def apply(data, *reducers):
+        results = passes(data, reducers)
+        for _ in range(repeat - 1):
+            results = [passes(part, (reducer,))[0] for part, reducer in zip(results, reducers)]
+        return results
+
+    if operation == 'gradient':
+        eroded, dilated = apply(array, 'min', 'max')
+        result = dilated - eroded
+    elif operation == 'erosion':
+        result = apply(array, 'min')[0]
+    elif operation == 'dilation':
+        result = apply(array, 'max')[0]
+    elif operation == 'opening':
+        result = apply(apply(array, 'min')[0], 'max')[0]
+    else:
+        result = apply(apply(array, 'max')[0], 'min')[0]
+    return like_input(np.ascontiguousarray(result), image)
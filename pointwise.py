@@ -0,0 +1,164 @@
+"""
+Pointwise operations compiled to 256-entry lookup tables and fused into one pass
+"""
+
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input, to_uint8
+from histogram import get_histogram_index
+
+LEVELS = np.arange(256, dtype=np.float64)
+
+# Arayüzlerdeki farklı adlar aynı dönüşüme gider
+TRANSFORM_ALIASES = {
+    'log': 'log',
+    'logarithmic': 'log',
+    'gamma': 'gamma',
+    'power-law': 'gamma',
+    'power_law': 'gamma',
+    'linear': 'linear',
+    'histogram': 'equalize',
+    'equalize': 'equalize',
+}
+
+
+def _log(histograms, c=1.0):
+    # s = c * log(1 + r), 0..255 aralığına ölçeklenmiş
+    return c * 255.0 / np.log(256.0) * np.log1p(LEVELS)
+
+
+def _gamma(histograms, gamma=1.0, c=1.0):
+    return c * 255.0 * (LEVELS / 255.0) ** gamma
+
+
+def _linear(histograms, alpha=None, beta=0.0):
+    """alpha * r + beta; without alpha, stretch the occupied range to 0..255"""
+    if alpha is not None:
+        return float(alpha) * LEVELS + float(beta)
+    tables = []
+    for hist in histograms:
+        occupied = np.flatnonzero(hist)
+        low, high = (occupied[0], occupied[-1]) if len(occupied) else (0, 255)
+        tables.append((LEVELS - low) * 255.0 / max(high - low, 1) + float(beta))
+    return np.stack(tables)
+
+
+def _equalize(histograms):
+    """Histogram equalization, same mapping as cv2.equalizeHist"""
+    tables = []
+    for hist in histograms:
+        cdf = np.cumsum(hist)
+        first = cdf[np.flatnonzero(hist)[0]] if cdf[-1] else 0
+        remaining = cdf[-1] - first
+        if remaining <= 0:
+            tables.append(LEVELS.copy())
+        else:
+            tables.append((cdf - first) * 255.0 / remaining)
+    return np.stack(tables)
+
+
+def _balance(histograms, r_scale=1.0, g_scale=1.0, b_scale=1.0):
+    if len(histograms) == 1:
+        return LEVELS.copy()
+    return np.stack([LEVELS * r_scale, LEVELS * g_scale, LEVELS * b_scale])
+
+
+def _threshold(histograms, threshold=127, max_value=255):
+    return np.where(LEVELS > threshold, float(max_value), 0.0)
+
+
+# İşlem adı -> (tablo üreticisi, histogram gerekir mi, gri girdi ister mi)
+POINTWISE_OPS = {
+    'log': (_log, False, False),
+    'gamma': (_gamma, False, False),
+    'linear': (_linear, True, False),
+    'equalize': (_equalize, True, False),
+    'color_balance': (_balance, False, False),
+    'threshold': (_threshold, False, True),
+}
+
+
+def build_lut(name, histograms, **params):
+    """Compile one pointwise step to a (channels, 256) uint8 table"""
+    builder = POINTWISE_OPS[name][0]
+    table = np.atleast_2d(builder(histograms, **params))
+    return np.broadcast_to(to_uint8(table), (len(histograms), 256))
+
+
+def compose_luts(first, second):
+    """Table equivalent to applying first and then second"""
+    first, second = np.broadcast_arrays(first, second)
+    return np.take_along_axis(second, first.astype(np.intp), axis=1)
+
+
+def _propagate(histograms, lut):
+    """Histograms of the output of lut, without touching the pixels"""
+    return np.stack([np.bincount(lut[c], weights=histograms[c], minlength=256)
+                     for c in range(len(histograms))])
+
+
+def _apply_lut(array, lut):
+    if array.ndim == 2:
+        return cv2.LUT(array, np.ascontiguousarray(lut[0]))
+    return cv2.LUT(array, np.ascontiguousarray(lut.T).reshape(256, 1, -1))
+
+
+def apply_pointwise(image, steps, image_key=None):
+    """Apply a chain of pointwise steps with a single table lookup per run
+
+    steps is a sequence of (name, params) pairs from POINTWISE_OPS.
+    Consecutive steps are composed into one table, so the pixels are read
+    once for the whole run. Data-dependent steps (stretch, equalize) get
+    their histograms by pushing the input histograms through the tables
+    composed so far. A color-to-gray conversion (before a threshold) is the
+    only point where the chain has to touch the pixels in between.
+    """
+    array = to_array(image)
+    if array.dtype != np.uint8:
+        raise ValueError("Pointwise tables need 8-bit images")
+
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    lut = np.broadcast_to(np.arange(256, dtype=np.uint8), (channels, 256))
+    histograms = None
+    pending = False
+
+    for name, params in steps:
+        if name not in POINTWISE_OPS:
+            raise ValueError(f"Unknown pointwise operation: {name}")
+        _, needs_histogram, needs_gray = POINTWISE_OPS[name]
+        if needs_gray and array.ndim == 3:
+            if pending:
+                array = _apply_lut(array, lut)
+            array = cv2.cvtColor(np.ascontiguousarray(array), cv2.COLOR_RGB2GRAY)
+            # image_key artık bu piksellere ait değil
+            lut, image_key = np.arange(256, dtype=np.uint8)[None, :], None
+            histograms, pending = None, False
+        if needs_histogram and histograms is None:
+            histograms = _propagate(get_histogram_index(array, image_key).channels, lut)
+        step = build_lut(name, histograms if histograms is not None else [None] * len(lut), **params)
+        if histograms is not None:
+            histograms = _propagate(histograms, step)
+        lut = compose_luts(lut, step)
+        pending = True
+
+    result = _apply_lut(array, lut) if pending else np.array(array)
+    return like_input(result, image)
+
+
+def intensity_transform(image, transform, params=None, image_key=None, **kwargs):
+    """Log, gamma, linear or equalization transform as one table lookup"""
+    if transform not in TRANSFORM_ALIASES:
+        raise ValueError(f"Unknown intensity transform: {transform}")
+    params = dict(params or {}, **kwargs)
+    return apply_pointwise(image, [(TRANSFORM_ALIASES[transform], params)], image_key)
+
+
+def color_balance(image, r_scale=1.0, g_scale=1.0, b_scale=1.0):
+    """Scale the red, green and blue channels by table lookup"""
+    return apply_pointwise(image, [('color_balance', dict(r_scale=r_scale, g_scale=g_scale, b_scale=b_scale))])
+
+
+def binary_threshold(image, threshold=127, max_value=255):
+    """Binary threshold on the gray image by table lookup"""
+    return apply_pointwise(image, [('threshold', dict(threshold=threshold, max_value=max_value))])
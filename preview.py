@@ -0,0 +1,62 @@
+"""
+Downscaled proxy images for real-time filter previews
+"""
+
+import weakref
+import threading
+import numpy as np
+from PIL import Image
+
+# Önizleme görüntüsünün en uzun kenarı (ekran boyutu)
+PREVIEW_MAX_SIDE = 1024
+
+_proxy_cache = {}
+_proxy_lock = threading.Lock()
+
+
+def _make_proxy(image, max_side):
+    """Downscale a PIL image or ndarray so its longer side is at most max_side"""
+    if isinstance(image, np.ndarray):
+        height, width = image.shape[:2]
+    else:
+        width, height = image.size
+    scale = min(1.0, max_side / max(width, height))
+    if scale >= 1.0:
+        return image, 1.0
+
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if isinstance(image, np.ndarray):
+        proxy = np.asarray(Image.fromarray(image).resize(size, Image.Resampling.BOX))
+    else:
+        proxy = image.resize(size, Image.Resampling.BOX)
+    return proxy, size[0] / width
+
+
+def get_preview_proxy(image, max_side=PREVIEW_MAX_SIDE):
+    """Return (proxy, scale) for image, building the proxy once per image object"""
+    key = (id(image), max_side)
+    with _proxy_lock:
+        entry = _proxy_cache.get(key)
+        if entry is not None and entry[0]() is image:
+            return entry[1], entry[2]
+
+    proxy, scale = _make_proxy(image, max_side)
+    try:
+        ref = weakref.ref(image, lambda _, key=key: _proxy_cache.pop(key, None))
+    except TypeError:
+        return proxy, scale
+    with _proxy_lock:
+        _proxy_cache[key] = (ref, proxy, scale)
+    return proxy, scale
+
+
+def scale_length(value, scale, minimum=0.1):
+    """Scale a spatial length (sigma, radius, bilateral sigma_space) to the proxy"""
+    return max(minimum, value * scale)
+
+
+def scale_kernel(size, scale):
+    """Scale an odd kernel size / diameter to the proxy, keeping it odd"""
+    scaled = max(1, int(round(size * scale)))
+    return scaled if scaled % 2 == 1 else scaled + 1
+
@@ -0,0 +1,346 @@
+"""
+Interleaved rANS codec for image bytes with an optional left/upper neighbour context model
+"""
+
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from arrays import to_array, like_input
+from bitpack import write_header, read_header
+from huffman import compress_huffman, decompress_huffman
+
+MAGIC = b'RAN1'
+# Frekanslar 2^PROB_BITS'e normalize edilir; durum [2^16, 2^32) aralığında, 16 bitlik kelimelerle
+PROB_BITS = 14
+PROB_SCALE = 1 << PROB_BITS
+STATE_LOW = 1 << 16
+# Şerit (lane) başına sembol sayısı sınırları (bağlamsız kip)
+MIN_LANE_SYMBOLS = 256
+MAX_LANE_SYMBOLS = 4096
+# Bağlam kipinde satırlar bu yükseklikte bağımsız şeritlere (strip) bölünür
+STRIP_ROWS = 256
+# |sol - üst| farkının bit uzunluğu bağlamı seçer (0-8)
+CONTEXT_BUCKETS = np.frexp(np.arange(256, dtype=np.float64))[1].astype(np.int64)
+CONTEXTS = int(CONTEXT_BUCKETS.max()) + 1
+# Bu kadar sembolden büyük akışlar iş parçacıklarıyla paralel çözülür
+PARALLEL_MIN_SYMBOLS = 1 << 20
+DECODE_THREADS = os.cpu_count() or 4
+
+_decode_executor = ThreadPoolExecutor(max_workers=DECODE_THREADS, thread_name_prefix='rans')
+
+
+def normalize_frequencies(counts, total=PROB_SCALE):
+    """Frequencies summing to total, at least 1 for every symbol that occurs"""
+    counts = np.asarray(counts, dtype=np.float64)
+    if not counts.any():
+        return np.zeros(len(counts), dtype=np.int64)
+    freqs = np.where(counts > 0, np.maximum(1, np.floor(counts * total / counts.sum())), 0).astype(np.int64)
+    missing = total - int(freqs.sum())
+    while missing:
+        largest = int(np.argmax(freqs))
+        change = missing if missing > 0 else -min(-missing, int(freqs[largest]) - 1)
+        freqs[largest] += change
+        missing -= change
+    return freqs
+
+
+class _Tables:
+    """Frequency, cumulative and slot lookup tables of every context
+
+    One extra identity context (frequency PROB_SCALE for symbol 0) is
+    appended: coding it leaves the state unchanged, so padding and idle
+    wavefront cells cost nothing and need no masks.
+    """
+
+    def __init__(self, freqs):
+        identity = np.zeros((1, 256), dtype=np.int64)
+        identity[0, 0] = PROB_SCALE
+        self.stored = np.asarray(freqs, dtype=np.int64).reshape(-1, 256)
+        self.identity = len(self.stored)
+        freqs = np.concatenate([self.stored, identity])
+        cums = np.cumsum(freqs, axis=1) - freqs
+        self.freq = freqs.ravel().astype(np.uint64)
+        self.cum = cums.ravel().astype(np.uint64)
+        lookup = np.zeros((len(freqs), PROB_SCALE), dtype=np.int64)
+        for context, row in enumerate(freqs):
+            if row.any():
+                lookup[context] = np.repeat(np.arange(256), row)
+        self.lookup = lookup.ravel()
+
+
+def _encode_lanes(tables, symbols, contexts):
+    """rANS-code the columns of (steps, lanes) symbol and context matrices
+
+    Lanes are independent coders advanced together, last step first. Each
+    step renormalizes (at most one 16-bit word per lane) and then codes one
+    symbol per lane. Returns the final states, the word count of every lane
+    and the words lane by lane in decoding order.
+    """
+    steps, lanes = symbols.shape
+    states = np.full(lanes, STATE_LOW, dtype=np.uint64)
+    words = np.empty((steps, lanes), dtype=np.uint16)
+    emitted = np.zeros((steps, lanes), dtype=bool)
+    shift = np.uint64(32 - PROB_BITS)
+    for step in range(steps - 1, -1, -1):
+        index = contexts[step].astype(np.int64) * 256 + symbols[step]
+        freq = tables.freq[index]
+        out = states >= freq << shift
+        words[step] = states
+        emitted[step] = out
+        states = np.where(out, states >> np.uint64(16), states)
+        quotient, remainder = np.divmod(states, freq)
+        states = (quotient << np.uint64(PROB_BITS)) + remainder + tables.cum[index]
+    # Çözücü kelimeleri adım sırasıyla okur: şerit başına artan adım
+    return states, emitted.sum(axis=0), words.T[emitted.T]
+
+
+def _decode_step(tables, states, positions, words, contexts):
+    """Decode one symbol on every lane, renormalizing from the lane's words"""
+    slots = states & np.uint64(PROB_SCALE - 1)
+    base = contexts * 256
+    symbols = tables.lookup[contexts * PROB_SCALE + slots.astype(np.int64)]
+    index = base + symbols
+    states[:] = tables.freq[index] * (states >> np.uint64(PROB_BITS)) + slots - tables.cum[index]
+    refill = np.flatnonzero(states < STATE_LOW)
+    if len(refill):
+        states[refill] = (states[refill] << np.uint64(16)) | words[positions[refill]]
+        positions[refill] += 1
+    return symbols
+
+
+def _lane_size(count):
+    return int(np.clip(int(np.sqrt(count)), MIN_LANE_SYMBOLS, MAX_LANE_SYMBOLS))
+
+
+def _plain_layout(symbols, steps, identity):
+    """Flat symbols as (steps, lanes) columns and their contexts; the tail is padding"""
+    lanes = -(-len(symbols) // steps)
+    padded = np.zeros(steps * lanes, dtype=np.uint8)
+    padded[:len(symbols)] = symbols
+    contexts = np.zeros(steps * lanes, dtype=np.uint8)
+    contexts[len(symbols):] = identity
+    return padded.reshape(lanes, steps).T, contexts.reshape(lanes, steps).T
+
+
+def _rows(array):
+    """Image rows of every channel plane stacked as (channels * height, width)"""
+    if array.ndim == 2:
+        return array
+    return array.transpose(2, 0, 1).reshape(-1, array.shape[1])
+
+
+def _strip_offsets(lanes, height):
+    """Row index of every lane inside its strip (0 marks a strip's first row)"""
+    return (np.arange(lanes) % height) % STRIP_ROWS
+
+
+def _neighbours(rows, first):
+    """Left and upper neighbours with the edge rules shared by encoder and decoder"""
+    left = np.zeros(rows.shape, dtype=np.int64)
+    upper = np.zeros(rows.shape, dtype=np.int64)
+    left[:, 1:] = rows[:, :-1]
+    upper[1:] = rows[:-1]
+    left[:, 0] = upper[:, 0]
+    upper[first] = left[first]
+    left[first, 0] = upper[first, 0] = 0
+    return left, upper
+
+
+def _residuals(rows, first):
+    """(residual, context) of every pixel: prediction is the left/upper average"""
+    left, upper = _neighbours(rows, first)
+    prediction = (left + upper + 1) >> 1
+    residuals = ((rows - prediction) & 0xFF).astype(np.uint8)
+    return residuals, CONTEXT_BUCKETS[np.abs(left - upper)].astype(np.uint8)
+
+
+def _skew(values, offsets, steps, fill):
+    """Wavefront layout: lane l holds its row at steps offsets[l] .. offsets[l] + width - 1"""
+    lanes, width = values.shape
+    skewed = np.full((steps, lanes), fill, dtype=values.dtype)
+    for offset in np.unique(offsets):
+        lane = np.flatnonzero(offsets == offset)
+        skewed[offset:offset + width, lane] = values[lane].T
+    return skewed
+
+
+def _unskew(skewed, offsets, width):
+    rows = np.empty((skewed.shape[1], width), dtype=skewed.dtype)
+    for offset in np.unique(offsets):
+        lane = np.flatnonzero(offsets == offset)
+        rows[lane] = skewed[offset:offset + width, lane].T
+    return rows
+
+
+def _decode_plain(tables, states, positions, words, steps, first, count):
+    """Decode lanes first, first + 1, ...; symbols past count are padding"""
+    starts = (first + np.arange(len(states))) * steps
+    output = np.empty((steps, len(states)), dtype=np.uint8)
+    for step in range(steps):
+        contexts = np.where(starts + step < count, 0, tables.identity)
+        output[step] = _decode_step(tables, states, positions, words, contexts)
+    return output.T.reshape(-1)
+
+
+def _decode_context(tables, states, positions, words, offsets, width):
+    """Wavefront decode of whole strips: at every step each lane's left and
+    upper neighbours were decoded one step earlier (by itself and the lane
+    above), so contexts and predictions are plain vector shifts."""
+    lanes = len(states)
+    steps = int(offsets.max()) + width
+    first = offsets == 0
+    previous = np.zeros(lanes, dtype=np.int64)
+    output = np.empty((steps, lanes), dtype=np.uint8)
+    for step in range(steps):
+        column = step - offsets
+        active = (column >= 0) & (column < width)
+        left = previous.copy()
+        upper = np.empty(lanes, dtype=np.int64)
+        upper[0] = 0
+        upper[1:] = previous[:-1]
+        start = column == 0
+        left[start] = upper[start]
+        upper[first] = left[first]
+        corner = first & start
+        left[corner] = upper[corner] = 0
+        contexts = np.where(active, CONTEXT_BUCKETS[np.abs(left - upper)], tables.identity)
+        residuals = _decode_step(tables, states, positions, words, contexts)
+        values = (residuals + ((left + upper + 1) >> 1)) & 0xFF
+        previous = np.where(active, values, previous)
+        output[step] = values
+    return _unskew(output, offsets, width)
+
+
+def _lane_groups(lanes, boundaries):
+    """Split lanes into up to DECODE_THREADS contiguous groups at allowed boundaries"""
+    if DECODE_THREADS <= 1:
+        return [(0, lanes)]
+    boundaries = np.append(boundaries, lanes)
+    cuts = boundaries[np.searchsorted(boundaries, np.linspace(0, lanes, DECODE_THREADS + 1))]
+    cuts = np.unique(np.concatenate([[0], cuts]))
+    return list(zip(cuts[:-1].tolist(), cuts[1:].tolist()))
+
+
+def compress_rans(image, quality=None, context=False):
+    """Lossless interleaved rANS stream of a PIL image or ndarray (quality is unused)
+
+    Without context, the bytes of the image are coded with one frequency
+    table, as compress_huffman codes them but without whole-bit code
+    lengths. With context, uint8 pixels are predicted from the average of
+    their left and upper neighbours and the residual is coded with one of
+    CONTEXTS tables chosen by |left - upper|.
+    """
+    array = np.ascontiguousarray(to_array(image))
+    if context and array.dtype != np.uint8:
+        raise ValueError("The rANS context model supports 8-bit images")
+    if array.size == 0:
+        context = False
+    if context:
+        rows = _rows(array)
+        height = array.shape[0]
+        offsets = _strip_offsets(len(rows), height)
+        residuals, contexts = _residuals(rows, offsets == 0)
+        counts = np.bincount((contexts.astype(np.int64) * 256 + residuals).ravel(), minlength=CONTEXTS * 256)
+        tables = _Tables([normalize_frequencies(row) for row in counts.reshape(CONTEXTS, 256)])
+        steps = int(offsets.max()) + rows.shape[1]
+        symbols = _skew(residuals, offsets, steps, 0)
+        contexts = _skew(contexts, offsets, steps, tables.identity)
+    else:
+        flat = array.reshape(-1).view(np.uint8)
+        tables = _Tables(normalize_frequencies(np.bincount(flat, minlength=256)))
+        steps = _lane_size(len(flat))
+        symbols, contexts = _plain_layout(flat, steps, tables.identity)
+    states, counts, words = _encode_lanes(tables, symbols, contexts)
+    return (write_header(MAGIC, array)
+            + struct.pack('<BHII', bool(context), len(tables.stored), symbols.shape[1], steps)
+            + tables.stored.astype('<u2').tobytes() + counts.astype('<u4').tobytes()
+            + states.astype('<u4').tobytes() + words.astype('<u2').tobytes())
+
+
+def decompress_rans(data, like=None):
+    """Decode a compress_rans stream to an ndarray (or a PIL image if like is one)
+
+    Large streams are decoded in groups of lanes (whole strips in context
+    mode) on the rANS thread pool.
+    """
+    data = memoryview(data)
+    dtype, shape, offset = read_header(data, MAGIC)
+    context, table_count, lanes, steps = struct.unpack_from('<BHII', data, offset)
+    offset += struct.calcsize('<BHII')
+    tables = _Tables(np.frombuffer(data, dtype='<u2', count=table_count * 256, offset=offset))
+    offset += table_count * 512
+    counts = np.frombuffer(data, dtype='<u4', count=lanes, offset=offset).astype(np.int64)
+    offset += 4 * lanes
+    initial = np.frombuffer(data, dtype='<u4', count=lanes, offset=offset).astype(np.uint64)
+    offset += 4 * lanes
+    words = np.frombuffer(data, dtype='<u2', count=int(counts.sum()), offset=offset).astype(np.uint64)
+    starts = np.cumsum(counts) - counts
+    size = int(np.prod(shape)) * dtype.itemsize
+
+    if context:
+        height, width = shape[0], shape[1]
+        offsets = _strip_offsets(lanes, height)
+        boundaries = np.flatnonzero(offsets == 0)
+
+        def decode(group):
+            begin, end = group
+            return _decode_context(tables, initial[begin:end].copy(), starts[begin:end].copy(),
+                                   words, offsets[begin:end], width)
+    else:
+        boundaries = np.arange(lanes)
+
+        def decode(group):
+            begin, end = group
+            return _decode_plain(tables, initial[begin:end].copy(), starts[begin:end].copy(), words,
+                                 steps, begin, size)
+
+    groups = _lane_groups(lanes, boundaries) if size >= PARALLEL_MIN_SYMBOLS else [(0, lanes)]
+    if len(groups) > 1:
+        parts = list(_decode_executor.map(decode, groups))
+    else:
+        parts = [decode(group) for group in groups]
+    decoded = np.concatenate(parts) if lanes else np.zeros(0, dtype=np.uint8)
+
+    if context:
+        array = decoded.reshape(-1, height, width)
+        array = array[0] if len(shape) == 2 else array.transpose(1, 2, 0)
+        array = np.ascontiguousarray(array)
+    else:
+        array = decoded[:size].view(dtype).reshape(shape)
+    return array if like is None else like_input(array, like)
+
+
+def benchmark(image, repeats=3):
+    """(codec, ratio, encode MB/s, decode MB/s) of Huffman and rANS side by side"""
+    array = np.ascontiguousarray(to_array(image))
+    codecs = [('huffman', compress_huffman, decompress_huffman),
+              ('rans', compress_rans, decompress_rans)]
+    if array.dtype == np.uint8:
+        codecs.append(('rans+context', lambda a: compress_rans(a, context=True), decompress_rans))
+    rows = []
+    for name, compress, decompress in codecs:
+        encode_time = decode_time = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            data = compress(array)
+            encode_time = min(encode_time, time.perf_counter() - start)
+            start = time.perf_counter()
+            decoded = decompress(data)
+            decode_time = min(decode_time, time.perf_counter() - start)
+        if not np.array_equal(decoded, array):
+            raise AssertionError(f"{name} round trip changed the image")
+        megabytes = array.nbytes / 1e6
+        rows.append((name, array.nbytes / len(data), megabytes / encode_time, megabytes / decode_time))
+    return rows
+
+
+if __name__ == "__main__":
+    # Kullanım: python rans.py resim.png
+    from PIL import Image
+    print(f"{'codec':>13} {'ratio':>8} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for name, ratio, encode_speed, decode_speed in benchmark(np.asarray(Image.open(sys.argv[1]))):
+        print(f"{name:>13} {ratio:>8.2f} {encode_speed:>9.1f} {decode_speed:>9.1f}")
@@ -0,0 +1,167 @@
+"""
+Content-addressed result cache for filter calls
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# Toplam önbellek boyutu (bayt) - IMAGE_APP_CACHE_MB ile değiştirilebilir
+DEFAULT_MAX_BYTES = int(os.environ.get('IMAGE_APP_CACHE_MB', '512')) * 1024 * 1024
+
+
+def image_digest(image):
+    """Return a content hash of a decoded image (PIL image or ndarray)"""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(image, Image.Image):
+        h.update(f"{image.mode}:{image.size}".encode())
+        h.update(image.tobytes())
+    else:
+        array = np.ascontiguousarray(image)
+        h.update(f"{array.dtype.str}:{array.shape}".encode())
+        h.update(memoryview(array).cast('B'))
+    return h.hexdigest()
+
+
+def _normalize(value):
+    """Turn a parameter into a hashable, order-independent value"""
+    if isinstance(value, float):
+        # 0.1 + 0.2 ve 0.3 aynı anahtara düşsün
+        return round(value, 9)
+    if isinstance(value, (np.integer, np.floating)):
+        return _normalize(value.item())
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, (np.ndarray, Image.Image)):
+        return ('image', image_digest(value))
+    return value
+
+
+def normalize_params(args, kwargs):
+    """Build the normalized parameter tuple used in cache keys"""
+    return (_normalize(tuple(args)), _normalize(kwargs))
+
+
+def result_nbytes(result):
+    """Approximate memory footprint of a cached result"""
+    if isinstance(result, Image.Image):
+        return result.width * result.height * len(result.getbands())
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if isinstance(result, (list, tuple)):
+        return sum(result_nbytes(item) for item in result)
+    if isinstance(result, dict):
+        return sum(result_nbytes(item) for item in result.values())
+    return 64
+
+
+class ResultCache:
+    """Process-wide LRU of filter results, bounded by total bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (found, value) and refresh the entry's recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        # PIL görüntüleri dondurulamaz: her çağırana kendi kopyası verilir
+        return True, value.copy() if isinstance(value, Image.Image) else value
+
+    def put(self, key, value):
+        """Insert a result, evicting least recently used entries over budget
+
+        Returns the value to hand out in place of the inserted one: arrays
+        become a read-only view, so every caller gets the same
+        non-writeable result whether the lookup hit or missed.
+        """
+        if isinstance(value, np.ndarray):
+            # Önbellekteki sonuç paylaşılır: salt okunur bir görünüm saklanır,
+            # çağıranın dizisinin bayrakları değişmez
+            value = value.view()
+            value.flags.writeable = False
+        size = result_nbytes(value)
+        if size > self.max_bytes:
+            return value
+        # PIL sonucunun önbellekteki kopyası çağıranınkinden bağımsızdır
+        stored = value.copy() if isinstance(value, Image.Image) else value
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (stored, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss/eviction counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_result_cache = ResultCache()
+
+
+def get_result_cache():
+    """Return the process-wide result cache"""
+    return _result_cache
+
+
+def cached_call(filter_name, func, image, *args, digest=None, **kwargs):
+    """Call func(image, *args, **kwargs) through the result cache
+
+    The key is the image content hash plus the filter name, the function
+    that computes it and the normalized parameters. Pass ``digest`` when
+    the image hash is already known to skip re-hashing the pixels. Array
+    results are returned read-only, on a hit or a miss alike.
+    """
+    if digest is None:
+        digest = image_digest(image)
+    # Aynı filtre adı altında birden çok işlev olabilir (ör. noise_reduction)
+    function = (getattr(func, '__module__', None), getattr(func, '__qualname__', repr(func)))
+    key = (filter_name, function, digest, normalize_params(args, kwargs))
+    found, result = _result_cache.get(key)
+    if found:
+        return result
+    result = func(image, *args, **kwargs)
+    if result is not None:
+        result = _result_cache.put(key, result)
+    return result
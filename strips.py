@@ -0,0 +1,240 @@
+"""
+Out-of-core strip processing for images larger than the memory budget
+"""
+
+import os
+import sys
+import zlib
+import struct
+import tempfile
+import numpy as np
+from PIL import Image
+
+from tiles import NEIGHBORHOOD_FILTERS, run_tiled
+
+# Tüm işlem hattı için bellek bütçesi (bayt) - IMAGE_APP_MEMORY_MB ile değiştirilebilir
+MEMORY_BUDGET = int(os.environ.get('IMAGE_APP_MEMORY_MB', '1024')) * 1024 * 1024
+# Bellek içi yol tam kareyi yaklaşık bu kadar kopya halinde tutar (PIL + NumPy)
+IN_MEMORY_COPIES = 4
+# Bir şeridin işlenmesi sırasında oluşan ara kopya sayısı
+STRIP_WORKING_COPIES = 6
+# Her şerit bu boyuttaki karolarla paralel işlenir
+STRIP_TILE_SIZE = 512
+# PNG satır filtreleri bu kadar satırlık bloklarla seçilir
+FILTER_ROWS = 64
+
+
+def in_memory_footprint(width, height, channels):
+    """Estimated peak bytes of processing a frame fully in memory"""
+    return width * height * channels * IN_MEMORY_COPIES
+
+
+def fits_in_memory(width, height, channels, memory_budget=None):
+    """True if the frame can go through the in-memory pipeline"""
+    budget = MEMORY_BUDGET if memory_budget is None else memory_budget
+    return in_memory_footprint(width, height, channels) <= budget
+
+
+def strip_rows_for_budget(width, channels, halo, memory_budget=None):
+    """Rows per strip so that one strip plus its halo stays within the budget"""
+    budget = MEMORY_BUDGET if memory_budget is None else memory_budget
+    row_bytes = width * channels * 4 * STRIP_WORKING_COPIES  # float32 ara sonuçlar
+    return max(1, budget // row_bytes - 2 * halo)
+
+
+# PIL kipi -> (kanal sayısı, NumPy veri tipi); 16 bit gri taramalar dahil
+PIXEL_MODES = {
+    'L': (1, np.dtype(np.uint8)),
+    'RGB': (3, np.dtype(np.uint8)),
+    'I;16': (1, np.dtype('<u2')),
+    'I;16B': (1, np.dtype('>u2')),
+}
+
+
+def _raw_layout(image):
+    """(offset, shape, dtype) if image's pixels are stored uncompressed in its file"""
+    if len(image.tile) != 1 or image.mode not in PIXEL_MODES:
+        return None
+    codec, extents, offset, args = image.tile[0]
+    if codec != 'raw' or tuple(extents) != (0, 0, image.width, image.height):
+        return None
+    args = args if isinstance(args, tuple) else (args,)
+    rawmode = args[0]
+    stride = args[1] if len(args) > 1 else 0
+    orientation = args[2] if len(args) > 2 else 1
+    channels, dtype = PIXEL_MODES[image.mode]
+    if rawmode != image.mode or orientation != 1 or stride not in (0, image.width * channels * dtype.itemsize):
+        return None
+    shape = (image.height, image.width) if channels == 1 else (image.height, image.width, channels)
+    return offset, shape, dtype
+
+
+def open_memmap_image(path, workdir=None, memory_budget=None):
+    """Open an image file as a disk-backed read-only uint8 (or 16-bit gray) array
+
+    Uncompressed TIFF/BMP/PPM pixels are mapped in place without decoding.
+    Other formats are decoded by PIL once and spilled to a temporary .npy
+    memory map in strips, after which the decoded frame is released.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+
+    with Image.open(path) as image:
+        layout = _raw_layout(image)
+        if layout is not None:
+            offset, shape, dtype = layout
+            return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+        if image.mode not in PIXEL_MODES:
+            image = image.convert('RGB')
+        channels, dtype = PIXEL_MODES[image.mode]
+        shape = (image.height, image.width) if channels == 1 else (image.height, image.width, channels)
+        fd, spill_path = tempfile.mkstemp(suffix='.npy', dir=workdir)
+        os.close(fd)
+        target = np.lib.format.open_memmap(spill_path, mode='w+', dtype=dtype.newbyteorder('='), shape=shape)
+        rows = strip_rows_for_budget(image.width, channels, 0, memory_budget)
+        for y0 in range(0, image.height, rows):
+            y1 = min(image.height, y0 + rows)
+            target[y0:y1] = np.asarray(image.crop((0, y0, image.width, y1)))
+        target.flush()
+        del target
+    array = np.load(spill_path, mmap_mode='r')
+    # Dosya eşlendikten sonra silinebilir (POSIX); eşleme kapanınca yer geri alınır
+    if os.name == 'posix':
+        os.unlink(spill_path)
+    return array
+
+
+class PngStripWriter:
+    """Streaming PNG encoder: rows are filtered, compressed and written as they arrive
+
+    Every row gets the PNG filter (None, Sub, Up, Average or Paeth) with the
+    smallest sum of absolute signed residuals, the heuristic libpng uses.
+    """
+
+    def __init__(self, fileobj, width, height, channels, level=6, bit_depth=8):
+        self.fileobj = fileobj
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.bit_depth = bit_depth
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(level)
+        # Filtreler bir önceki satıra bakar; parçalar arasında son satır taşınır
+        self._previous = np.zeros(width * channels * bit_depth // 8, dtype=np.uint8)
+        color_type = {1: 0, 3: 2, 4: 6}[channels]
+        fileobj.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self.fileobj.write(struct.pack('>I', len(data)))
+        self.fileobj.write(tag)
+        self.fileobj.write(data)
+        self.fileobj.write(struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    def _filter(self, rows):
+        """Filter type byte plus filtered bytes for every row of a uint8 block"""
+        step = self.channels * self.bit_depth // 8
+        current = rows.astype(np.int16)
+        up = np.vstack([self._previous[None], rows[:-1]]).astype(np.int16)
+        left = np.zeros_like(current)
+        left[:, step:] = current[:, :-step]
+        upper_left = np.zeros_like(current)
+        upper_left[:, step:] = up[:, :-step]
+        # Paeth: sol, üst ve sol üstten p = a + b - c'ye en yakın olan
+        estimate = left + up - upper_left
+        distance_left = np.abs(estimate - left)
+        distance_up = np.abs(estimate - up)
+        distance_upper_left = np.abs(estimate - upper_left)
+        paeth = np.where((distance_left <= distance_up) & (distance_left <= distance_upper_left), left,
+                         np.where(distance_up <= distance_upper_left, up, upper_left))
+        candidates = np.stack([current, current - left, current - up, current - (left + up) // 2,
+                               current - paeth]).astype(np.uint8)
+        # Artıklar işaretli bayt olarak değerlendirilir
+        costs = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+        kinds = costs.argmin(axis=0).astype(np.uint8)
+        framed = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        framed[:, 0] = kinds
+        framed[:, 1:] = candidates[kinds, np.arange(rows.shape[0])]
+        self._previous = rows[-1].copy()
+        return framed
+
+    def write_rows(self, rows):
+        """Append a block of rows (H x W [x C] uint8, or uint16 at bit depth 16)"""
+        if not len(rows):
+            return
+        # PNG 16 bit örnekleri büyük endian saklar
+        dtype = np.uint8 if self.bit_depth == 8 else np.dtype('>u2')
+        rows = np.ascontiguousarray(rows, dtype=dtype).reshape(rows.shape[0], -1).view(np.uint8)
+        # Filtre adayları satır başına ~10 kat yer tutar; küçük bloklarla sınırlanır
+        for start in range(0, rows.shape[0], FILTER_ROWS):
+            data = self._compressor.compress(self._filter(rows[start:start + FILTER_ROWS]).tobytes())
+            if data:
+                self._chunk(b'IDAT', data)
+        self.rows_written += rows.shape[0]
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG expects {self.height} rows, got {self.rows_written}")
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+
+
+def process_strips(source, func, halo, sink, strip_rows=None, memory_budget=None):
+    """Apply a neighborhood filter strip by strip
+
+    func(block) must return an array of the same height as block. Each
+    strip is read with ``halo`` extra rows above and below (clamped at the
+    image border, where func's own border handling applies), so output rows
+    are identical to filtering the whole frame as long as the filter's
+    vertical footprint radius is at most halo. sink(rows) receives the
+    output rows in order.
+    """
+    height, width = source.shape[:2]
+    channels = 1 if source.ndim == 2 else source.shape[2]
+    if strip_rows is None:
+        strip_rows = strip_rows_for_budget(width, channels, halo, memory_budget)
+
+    for y0 in range(0, height, strip_rows):
+        y1 = min(height, y0 + strip_rows)
+        top = max(0, y0 - halo)
+        bottom = min(height, y1 + halo)
+        block = np.ascontiguousarray(source[top:bottom])
+        result = func(block)
+        sink(result[y0 - top:y0 - top + (y1 - y0)])
+
+
+def process_file(src_path, dst_path, filter_name, memory_budget=None, codec=None, quality=None, **params):
+    """Filter an image file of any size with bounded memory
+
+    The output codec comes from the codec registry, by name or by
+    dst_path's extension (PNG streams natively, the others in row chunks).
+    """
+    # codec_registry bu modülü içe aktarır; döngüyü önlemek için geç içe aktarma
+    from codec_registry import get_codec, codec_for_path
+    if filter_name not in NEIGHBORHOOD_FILTERS:
+        raise ValueError(f"Filter does not support strip mode: {filter_name}")
+    func, halo = NEIGHBORHOOD_FILTERS[filter_name](params)
+    source = open_memmap_image(src_path, os.path.dirname(os.path.abspath(dst_path)), memory_budget)
+    height, width = source.shape[:2]
+    channels = 1 if source.ndim == 2 else source.shape[2]
+
+    codec = codec_for_path(dst_path) if codec is None else get_codec(codec)
+    shape = (height, width) if channels == 1 else (height, width, channels)
+
+    with open(dst_path, 'wb') as fileobj:
+        writer = codec.open_writer(fileobj, shape, source.dtype, quality, memory_budget=memory_budget)
+        process_strips(source, lambda block: run_tiled(block, func, halo, STRIP_TILE_SIZE),
+                       halo, writer.write_rows, memory_budget=memory_budget)
+        writer.close()
+
+
+if __name__ == "__main__":
+    # Kullanım: python strips.py girdi.tif cikti.png gaussian_blur sigma=4 [codec=loco] [quality=90]
+    src, dst, name = sys.argv[1:4]
+    # Toplu işlemde sınır bellek bütçesidir, PIL'in piksel sayısı sınırı değil
+    Image.MAX_IMAGE_PIXELS = None
+    options = dict(arg.split('=', 1) for arg in sys.argv[4:])
+    quality = options.pop('quality', None)
+    process_file(src, dst, name, codec=options.pop('codec', None),
+                 quality=None if quality is None else int(quality), **options)
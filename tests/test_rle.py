@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from rle import MODES, compress_rle, decompress_rle, encode_varints, decode_varints
+
+rng = np.random.default_rng(0)
+
+IMAGES = {
+    'empty': np.zeros((0, 0), dtype=np.uint8),
+    'empty_rows': np.zeros((0, 7, 3), dtype=np.uint8),
+    'single_pixel': np.array([[200]], dtype=np.uint8),
+    'single_rgb_pixel': np.array([[[1, 2, 3]]], dtype=np.uint8),
+    'constant': np.full((40, 60), 17, dtype=np.uint8),
+    'constant_rgb': np.full((33, 21, 3), (9, 250, 0), dtype=np.uint8),
+    'random_rgb': rng.integers(0, 256, (31, 47, 3), dtype=np.uint8),
+    'stripes': np.repeat(np.arange(64, dtype=np.uint8)[:, None] // 8 * 30, 50, axis=1),
+    'uint16': rng.integers(0, 1 << 16, (23, 19), dtype=np.uint16),
+    'uint16_rgba': np.repeat(rng.integers(0, 1 << 16, (12, 1, 4), dtype=np.uint16), 9, axis=1),
+    'bool': rng.random((50, 70)) > 0.8,
+    'bool_first_set': np.ones((5, 5), dtype=bool),
+}
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', sorted(IMAGES))
+def test_round_trip(name, mode):
+    image = IMAGES[name]
+    decoded = decompress_rle(compress_rle(image, mode=mode))
+    assert decoded.dtype == image.dtype
+    assert decoded.shape == image.shape
+    assert np.array_equal(decoded, image)
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_round_trip_pil(mode):
+    image = Image.fromarray(IMAGES['random_rgb'])
+    decoded = decompress_rle(compress_rle(image, mode=mode), image)
+    assert isinstance(decoded, Image.Image)
+    assert np.array_equal(np.asarray(decoded), IMAGES['random_rgb'])
+
+
+def test_constant_image_is_one_run():
+    image = IMAGES['constant']
+    assert len(compress_rle(image)) < 64
+
+
+def test_varints():
+    values = np.array([0, 1, 127, 128, 300, 1 << 35, (1 << 64) - 1], dtype=np.uint64)
+    decoded, used = decode_varints(encode_varints(values))
+    assert np.array_equal(decoded, values)
+    assert used == len(encode_varints(values))
+
+
+def test_rejects_unknown_mode_and_dtype():
+    with pytest.raises(ValueError):
+        compress_rle(IMAGES['constant'], mode='zigzag')
+    with pytest.raises(ValueError):
+        compress_rle(np.zeros((2, 2), dtype=np.float32))
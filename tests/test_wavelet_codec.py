@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from wavelet_codec import encode_stream, decompress_wavelet, compress_wavelet
+from arrays import psnr
+
+rng = np.random.default_rng(0)
+
+IMAGES = {
+    'gray': rng.integers(0, 256, (29, 37), dtype=np.uint8),
+    'rgb': rng.integers(0, 256, (33, 47, 3), dtype=np.uint8),
+    'smooth_rgb': np.dstack([np.add.outer(np.arange(40), np.arange(52)).astype(np.uint8)] * 3),
+}
+
+
+@pytest.fixture(params=sorted(IMAGES))
+def stream(request):
+    image = IMAGES[request.param]
+    data, boundaries = encode_stream(image)
+    return image, data, boundaries
+
+
+def test_full_stream_is_near_lossless(stream):
+    image, data, _ = stream
+    decoded = decompress_wavelet(data)
+    assert decoded.shape == image.shape
+    assert decoded.dtype == image.dtype
+    assert psnr(image, decoded) > 45
+
+
+def test_any_prefix_decodes_like_last_complete_chunk(stream):
+    image, data, boundaries = stream
+    offsets = np.unique(np.concatenate([
+        rng.integers(boundaries[0], len(data), 40),
+        np.array(boundaries[1:6]) + 1,
+        np.array(boundaries[1:6]) - 1,
+        [boundaries[0]],
+    ]))
+    for offset in offsets:
+        floor = boundaries[np.searchsorted(boundaries, offset, side='right') - 1]
+        decoded = decompress_wavelet(data[:offset])
+        assert decoded.shape == image.shape
+        assert np.array_equal(decoded, decompress_wavelet(data[:floor]))
+
+
+def test_lower_quality_is_prefix():
+    image = IMAGES['rgb']
+    low, high = compress_wavelet(image, 30), compress_wavelet(image, 90)
+    assert len(low) < len(high)
+    assert high.startswith(low)
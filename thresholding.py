@@ -0,0 +1,196 @@
+"""
+Thresholding engine: histogram Otsu and integral-image adaptive thresholds
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+from result_cache import image_digest
+from histogram import get_histogram_index
+from pointwise import apply_pointwise
+
+LOCAL_METHODS = ('adaptive', 'niblack', 'sauvola')
+# Yöntem başına varsayılan k (Niblack negatif, Sauvola pozitif kullanılır)
+DEFAULT_K = {
+    'niblack': -0.2,
+    'sauvola': 0.34,
+}
+# Sauvola'da standart sapmanın dinamik aralığı (8 bit için 128)
+SAUVOLA_RANGE = 128.0
+# Yerel istatistikler bu kadar satırlık şeritlerle hesaplanır (geçici bellek sınırı)
+STRIP_ROWS = 512
+MAX_CACHED_INTEGRALS = 2
+
+_integrals = OrderedDict()
+_integrals_lock = threading.Lock()
+
+
+def _gray(array):
+    if array.ndim == 2:
+        return array
+    return cv2.cvtColor(np.ascontiguousarray(array), cv2.COLOR_RGB2GRAY)
+
+
+def get_integrals(image, image_key=None):
+    """Gray image with its summed-area and squared summed-area tables
+
+    The tables do not depend on the block size, so block-size changes only
+    redo the O(1) box lookups.
+    """
+    array = to_array(image)
+    if image_key is None:
+        image_key = image_digest(array)
+    with _integrals_lock:
+        entry = _integrals.get(image_key)
+        if entry is not None:
+            _integrals.move_to_end(image_key)
+            return entry
+    gray = _gray(array)
+    total, squared = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    entry = (gray, total, squared)
+    with _integrals_lock:
+        _integrals[image_key] = entry
+        while len(_integrals) > MAX_CACHED_INTEGRALS:
+            _integrals.popitem(last=False)
+    return entry
+
+
+def _clamped_window(table, start, stop, radius, width):
+    """Rows start-radius..stop+radius of table, with indices clamped at the border
+
+    With clamped indices, window sums for rows start..stop reduce to four
+    slices, and windows are clipped at the image border.
+    """
+    height = table.shape[0] - 1
+    rows = np.clip(np.arange(start - radius, stop + radius + 1), 0, height)
+    cols = np.clip(np.arange(-radius, width + radius + 1), 0, width)
+    return table[rows][:, cols]
+
+
+def _box_sums(window, size, height, width):
+    return (window[size:size + height, size:size + width] - window[:height, size:size + width]
+            - window[size:size + height, :width] + window[:height, :width])
+
+
+def local_threshold(image, method='adaptive', block_size=11, c=2.0, k=None, max_value=255, image_key=None):
+    """Per-pixel threshold from the local mean (and deviation) of a block
+
+    adaptive: T = round(mean) - ceil(c) (the cv2 ADAPTIVE_THRESH_MEAN_C rule,
+              which compares against the 8-bit rounded box mean)
+    niblack:  T = mean + k * std
+    sauvola:  T = mean * (1 + k * (std / R - 1))
+
+    Window sums come from the cached integral images, so the cost per pixel
+    does not depend on block_size. Windows are clipped at the image border.
+    """
+    if method not in LOCAL_METHODS:
+        raise ValueError(f"Unknown local threshold method: {method}")
+    gray, total, squared = get_integrals(image, image_key)
+    height, width = gray.shape
+    radius = max(1, int(block_size) // 2)
+    size = 2 * radius + 1
+    k = DEFAULT_K.get(method, 0.0) if k is None else float(k)
+
+    def extent(length):
+        index = np.arange(length)
+        return (np.minimum(index + radius + 1, length) - np.maximum(index - radius, 0)).astype(np.float64)
+
+    row_extent, col_extent = extent(height), extent(width)
+    output = np.empty((height, width), dtype=np.uint8)
+    for start in range(0, height, STRIP_ROWS):
+        stop = min(height, start + STRIP_ROWS)
+        rows = stop - start
+        counts = row_extent[start:stop, None] * col_extent[None, :]
+        mean = _box_sums(_clamped_window(total, start, stop, radius, width), size, rows, width) / counts
+        if method == 'adaptive':
+            # cv2 ortalamayı uint8'e yuvarlar ve c'yi yukarı yuvarlar
+            limit = np.rint(mean) - np.ceil(c)
+        else:
+            sq = _box_sums(_clamped_window(squared, start, stop, radius, width), size, rows, width)
+            std = np.sqrt(np.maximum(sq / counts - mean ** 2, 0.0))
+            if method == 'niblack':
+                limit = mean + k * std
+            else:
+                limit = mean * (1.0 + k * (std / SAUVOLA_RANGE - 1.0))
+        output[start:stop] = np.where(gray[start:stop] > limit, max_value, 0)
+    return like_input(output, image)
+
+
+def otsu_threshold(histogram):
+    """Otsu's threshold from a 256-bin histogram (pixels > t are foreground)"""
+    hist = np.asarray(histogram, dtype=np.float64)
+    levels = np.arange(len(hist))
+    weight = np.cumsum(hist)
+    moment = np.cumsum(hist * levels)
+    total, total_moment = weight[-1], moment[-1]
+    background = weight[:-1]
+    foreground = total - background
+    valid = (background > 0) & (foreground > 0)
+    if not valid.any():
+        return 0
+    between = np.zeros(len(hist) - 1)
+    mean_b = moment[:-1][valid] / background[valid]
+    mean_f = (total_moment - moment[:-1][valid]) / foreground[valid]
+    between[valid] = background[valid] * foreground[valid] * (mean_b - mean_f) ** 2
+    return int(np.argmax(between))
+
+
+def multi_otsu_thresholds(histogram, classes=3):
+    """Thresholds splitting a 256-bin histogram into classes (Liao et al. 2001)
+
+    Maximizes the between-class variance by dynamic programming over the
+    cumulative sums, O(classes * 256^2) regardless of image size.
+    """
+    hist = np.asarray(histogram, dtype=np.float64)
+    bins = len(hist)
+    classes = int(max(2, min(classes, bins)))
+    weight = np.concatenate([[0.0], np.cumsum(hist)])
+    moment = np.concatenate([[0.0], np.cumsum(hist * np.arange(bins))])
+    # score[i, j]: bins i..j-1 tek sınıf olarak (w * mu^2 katkısı)
+    w = weight[None, :] - weight[:, None]
+    m = moment[None, :] - moment[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.where(w > 0, m * m / w, 0.0)
+    score[np.tril_indices(bins + 1)] = -np.inf
+
+    # best[j]: ilk j kutuyu mevcut sınıf sayısına bölmenin en iyi skoru
+    best = score[0].copy()
+    choices = []
+    for _ in range(classes - 1):
+        candidates = best[:, None] + score
+        choices.append(np.argmax(candidates, axis=0))
+        best = candidates.max(axis=0)
+
+    thresholds = []
+    end = bins
+    for choice in reversed(choices):
+        end = int(choice[end])
+        thresholds.append(end - 1)
+    return sorted(thresholds)
+
+
+def threshold_image(image, method='binary', threshold=127, max_value=255, block_size=11,
+                    c=2.0, k=None, classes=2, image_key=None):
+    """Binary, Otsu, multi-level Otsu or local threshold of a PIL image or ndarray"""
+    if method in LOCAL_METHODS:
+        return local_threshold(image, method, block_size, c, k, max_value, image_key)
+    if method == 'binary':
+        return apply_pointwise(image, [('threshold', dict(threshold=threshold, max_value=max_value))], image_key)
+    if method != 'otsu':
+        raise ValueError(f"Unknown threshold method: {method}")
+
+    array = to_array(image)
+    histogram = get_histogram_index(array, image_key).gray
+    gray = _gray(array)
+    if classes <= 2:
+        steps = [('threshold', dict(threshold=otsu_threshold(histogram), max_value=max_value))]
+        return like_input(apply_pointwise(gray, steps), image)
+
+    # Çok seviyeli: her sınıf eşit aralıklı bir gri seviyeye boyanır
+    thresholds = multi_otsu_thresholds(histogram, classes)
+    labels = np.searchsorted(np.asarray(thresholds), np.arange(256), side='left')
+    lut = np.rint(labels * max_value / (len(thresholds))).astype(np.uint8)
+    return like_input(cv2.LUT(gray, lut), image)
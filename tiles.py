@@ -0,0 +1,164 @@
+"""
+Thread-parallel tile scheduler for neighborhood filters
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import cv2
+
+from arrays import to_array, like_input
+from gaussian import gaussian_blur, default_kernel_size
+from morphology import morphology
+from rank import median_filter, rank_filter
+
+# Karo işleri için ayrı havuz: workers havuzundaki bir iş kendi karolarını
+# beklerken kilitlenme olmasın
+TILE_POOL_SIZE = os.cpu_count() or 4
+# Tek bir isteğin aynı anda kullanabileceği iş parçacığı sayısı
+TILE_THREADS_PER_REQUEST = int(os.environ.get('IMAGE_APP_TILE_THREADS', str(max(1, TILE_POOL_SIZE // 4))))
+# Otomatik ayar sırasında denenen karo kenar uzunlukları
+TILE_SIZE_CANDIDATES = (256, 512, 1024, 2048)
+
+_tile_executor = ThreadPoolExecutor(max_workers=TILE_POOL_SIZE, thread_name_prefix='tile')
+
+# (filtre, kanal) -> {karo boyutu: piksel/saniye}
+_tuning = {}
+_tuning_lock = threading.Lock()
+
+
+def _gaussian(params):
+    sigma = float(params.get('sigma', 1.0))
+    kernel_size = int(params.get('kernel_size') or default_kernel_size(sigma))
+    return (lambda block: gaussian_blur(block, kernel_size, sigma, backend='separable')), kernel_size // 2
+
+
+def _median(params):
+    kernel_size = int(params.get('kernel_size', 5)) | 1
+    return (lambda block: median_filter(block, kernel_size)), kernel_size // 2
+
+
+def _rank(params):
+    kernel_size = int(params.get('kernel_size', 5)) | 1
+    percentile = float(params.get('percentile', 50))
+    return (lambda block: rank_filter(block, kernel_size, percentile)), kernel_size // 2
+
+
+def _bilateral(params):
+    d = int(params.get('d', 9))
+    sigma_color = float(params.get('sigma_color', 75))
+    sigma_space = float(params.get('sigma_space', 75))
+    # d <= 0 ise OpenCV yarıçapı sigma_space'ten türetir: round(1.5 * sigma_space)
+    halo = d // 2 if d > 0 else int(round(1.5 * sigma_space))
+    return (lambda block: cv2.bilateralFilter(block, d, sigma_color, sigma_space)), halo
+
+
+def _morphology(params):
+    operation = params.get('operation', 'erosion')
+    kernel_shape = params.get('kernel_shape', 'rect')
+    kernel_size = int(params.get('kernel_size', 5))
+    iterations = int(params.get('iterations', 1))
+    # Açma/kapama iki geçiştir; ayak izi her iterasyonda büyür
+    passes = 2 if operation in ('opening', 'closing') else 1
+    halo = (kernel_size // 2) * iterations * passes
+    return (lambda block: morphology(block, operation, kernel_shape, kernel_size, iterations)), halo
+
+
+# Filtre adı -> params ile (işlev, halo) üreten fonksiyon
+NEIGHBORHOOD_FILTERS = {
+    'gaussian_blur': _gaussian,
+    'median': _median,
+    'rank': _rank,
+    'bilateral': _bilateral,
+    'morphological': _morphology,
+}
+
+
+def split_tiles(height, width, tile_size):
+    """Yield (y0, y1, x0, x1) tiles covering the frame"""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(height, y0 + tile_size), x0, min(width, x0 + tile_size)
+
+
+def choose_tile_size(filter_key, halo):
+    """Auto-tune the tile size: try each candidate once, then keep the fastest"""
+    candidates = [size for size in TILE_SIZE_CANDIDATES if size >= 4 * halo] or [TILE_SIZE_CANDIDATES[-1]]
+    with _tuning_lock:
+        measured = _tuning.setdefault(filter_key, {})
+        for size in candidates:
+            if size not in measured:
+                return size
+        return max(candidates, key=lambda size: measured[size])
+
+
+def _record(filter_key, tile_size, pixels, seconds):
+    with _tuning_lock:
+        measured = _tuning.setdefault(filter_key, {})
+        throughput = pixels / max(seconds, 1e-9)
+        # Üstel ortalama: yük değiştikçe ayar da güncellenir
+        previous = measured.get(tile_size)
+        measured[tile_size] = throughput if previous is None else 0.7 * previous + 0.3 * throughput
+
+
+def run_tiled(array, func, halo, tile_size, max_threads=None):
+    """Run func on halo-padded tiles in parallel and stitch the cores
+
+    Each tile is cut with ``halo`` extra pixels on every side (clamped at
+    the frame border, where func's own border handling applies), so the
+    stitched result is bit-identical to func(array) for any filter whose
+    footprint radius is at most halo.
+    """
+    height, width = array.shape[:2]
+    max_threads = max(1, max_threads or TILE_THREADS_PER_REQUEST)
+    tiles = list(split_tiles(height, width, tile_size))
+    if len(tiles) == 1:
+        return func(array)
+
+    def work(tile):
+        y0, y1, x0, x1 = tile
+        top, left = max(0, y0 - halo), max(0, x0 - halo)
+        bottom, right = min(height, y1 + halo), min(width, x1 + halo)
+        result = func(np.ascontiguousarray(array[top:bottom, left:right]))
+        return tile, result[y0 - top:y1 - top, x0 - left:x1 - left]
+
+    output = None
+    pending = set()
+    queue = iter(tiles)
+    while True:
+        # İstek başına en fazla max_threads karo aynı anda çalışır
+        while len(pending) < max_threads:
+            tile = next(queue, None)
+            if tile is None:
+                break
+            pending.add(_tile_executor.submit(work, tile))
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            (y0, y1, x0, x1), core = future.result()
+            if output is None:
+                output = np.empty((height, width) + core.shape[2:], dtype=core.dtype)
+            output[y0:y1, x0:x1] = core
+    return output
+
+
+def tiled_filter(image, filter_name, tile_size=None, max_threads=None, **params):
+    """Apply a registered neighborhood filter with the tile scheduler"""
+    if filter_name not in NEIGHBORHOOD_FILTERS:
+        raise ValueError(f"Unknown neighborhood filter: {filter_name}")
+    array = to_array(image)
+    func, halo = NEIGHBORHOOD_FILTERS[filter_name](params)
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    filter_key = (filter_name, channels, halo)
+
+    tuned = tile_size is None
+    if tuned:
+        tile_size = choose_tile_size(filter_key, halo)
+    start = time.perf_counter()
+    result = run_tiled(array, func, halo, tile_size, max_threads)
+    if tuned:
+        _record(filter_key, tile_size, array.shape[0] * array.shape[1], time.perf_counter() - start)
+    return like_input(result, image)
@@ -5,10 +5,22 @@ Utility functions for Streamlit application
 import streamlit as st
 import os
 import markdown
+import threading
+from collections import OrderedDict
 import numpy as np
-from PIL import Image
-import io
+import cv2
 from languages import get_text
+from image_store import store_upload, get_image
+from strips import fits_in_memory, MEMORY_BUDGET
+from histogram import get_histogram_index
+from codec_registry import get_codec
+from result_cache import image_digest
+from arrays import to_array
+
+# İndirme dosyaları (görüntü, kodek, kalite) başına önbellekte tutulur
+MAX_CACHED_DOWNLOADS = 4
+_downloads = OrderedDict()
+_downloads_lock = threading.Lock()
 
 def apply_dark_mode():
     """Apply dark mode styling to the Streamlit app"""
@@ -181,7 +193,7 @@ def display_image_stats(image, title="Görüntü Bilgileri"):
     """Görüntü istatistiklerini göster"""
     st.subheader(title)
     
-    img_array = np.array(image)
+    histograms = get_histogram_index(image)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -192,7 +204,7 @@ def display_image_stats(image, title="Görüntü Bilgileri"):
         st.metric("Yükseklik", f"{image.height} px")
     
     with col3:
-        st.metric("Kanal Sayısı", len(img_array.shape) if len(img_array.shape) == 2 else img_array.shape[2])
+        st.metric("Kanal Sayısı", histograms.channels.shape[0])
     
     with col4:
         total_pixels = image.width * image.height
@@ -204,17 +216,15 @@ def display_image_stats(image, title="Görüntü Bilgileri"):
         
         fig, ax = plt.subplots(figsize=(10, 4))
         
-        if len(img_array.shape) == 3:
+        if histograms.is_color:
             # Renkli görüntü
             colors = ['red', 'green', 'blue']
             for i, color in enumerate(colors):
-                hist = np.histogram(img_array[:, :, i].flatten(), bins=50)[0]
-                ax.plot(hist, color=color, alpha=0.7, label=f'{color.title()} Kanal')
+                ax.plot(histograms.channels[i], color=color, alpha=0.7, label=f'{color.title()} Kanal')
             ax.legend()
         else:
             # Gri tonlamalı görüntü
-            hist = np.histogram(img_array.flatten(), bins=50)[0]
-            ax.plot(hist, color='gray', label='Gri Ton')
+            ax.plot(histograms.channels[0], color='gray', label='Gri Ton')
             ax.legend()
         
         ax.set_title("Piksel Değer Dağılımı")
@@ -437,8 +447,12 @@ def display_filter_theory(category, filter_name, language='tr'):
     else:
         st.info("Bu filtre için detaylı bilgi henüz eklenmemiş." if language == 'tr' else "Detailed information not yet available for this filter.")
 
-def show_before_after_comparison(original, processed, titles=None):
-    """Show before/after comparison with enhanced UI"""
+def show_before_after_comparison(original, processed, titles=None, original_key=None, processed_key=None):
+    """Show before/after comparison with enhanced UI
+
+    original_key and processed_key (the image store digest and the result
+    cache key) let the statistics reuse the cached histogram indexes.
+    """
     if titles is None:
         titles = ["Orijinal", "İşlenmiş"]
     
@@ -463,33 +477,36 @@ def show_before_after_comparison(original, processed, titles=None):
             st.image(processed, caption=f"{titles[1]} ({comparison_ratio*100:.0f}%)", use_column_width=True)
     
     with tab3:
-        display_comparison_stats(original, processed)
+        display_comparison_stats(original, processed, original_key, processed_key)
 
-def display_comparison_stats(original, processed):
+def display_comparison_stats(original, processed, original_key=None, processed_key=None):
     """Display enhanced comparison statistics"""
-    import numpy as np
-    
-    orig_array = np.array(original)
-    proc_array = np.array(processed)
+    # Kopyasız görünümler; anahtarlar verilirse görüntüler yeniden özetlenmez
+    orig_array = to_array(original)
+    proc_array = to_array(processed)
+    orig_hist = get_histogram_index(orig_array, original_key).combined()
+    proc_hist = get_histogram_index(proc_array, processed_key).combined()
     
     st.markdown("#### 📈 Görüntü İstatistikleri Karşılaştırması")
     
     col1, col2, col3, col4 = st.columns(4)
     
+    levels = np.arange(256)
     with col1:
-        orig_mean = np.mean(orig_array)
-        proc_mean = np.mean(proc_array)
+        orig_mean = orig_hist @ levels / orig_hist.sum()
+        proc_mean = proc_hist @ levels / proc_hist.sum()
         delta_mean = proc_mean - orig_mean
         st.metric("Ortalama Değer", f"{proc_mean:.1f}", f"{delta_mean:+.1f}")
     
     with col2:
-        orig_std = np.std(orig_array)
-        proc_std = np.std(proc_array)
+        orig_std = np.sqrt(orig_hist @ (levels - orig_mean) ** 2 / orig_hist.sum())
+        proc_std = np.sqrt(proc_hist @ (levels - proc_mean) ** 2 / proc_hist.sum())
         delta_std = proc_std - orig_std
         st.metric("Standart Sapma", f"{proc_std:.1f}", f"{delta_std:+.1f}")
     
     with col3:
-        mse = np.mean((orig_array - proc_array) ** 2)
+        # uint8 farkı taşmasın: karesel hata cv2.norm ile tek geçişte
+        mse = cv2.norm(orig_array, proc_array, cv2.NORM_L2SQR) / orig_array.size
         st.metric("MSE", f"{mse:.2f}")
     
     with col4:
@@ -509,12 +526,10 @@ def display_comparison_stats(original, processed):
         fig = make_subplots(rows=1, cols=2, subplot_titles=('Orijinal', 'İşlenmiş'))
         
         # Original histogram
-        hist_orig, bins = np.histogram(orig_array.flatten(), bins=50)
-        fig.add_trace(go.Scatter(x=bins[:-1], y=hist_orig, name='Orijinal', line=dict(color='blue')), row=1, col=1)
+        fig.add_trace(go.Scatter(x=levels, y=orig_hist, name='Orijinal', line=dict(color='blue')), row=1, col=1)
         
         # Processed histogram  
-        hist_proc, bins = np.histogram(proc_array.flatten(), bins=50)
-        fig.add_trace(go.Scatter(x=bins[:-1], y=hist_proc, name='İşlenmiş', line=dict(color='red')), row=1, col=2)
+        fig.add_trace(go.Scatter(x=levels, y=proc_hist, name='İşlenmiş', line=dict(color='red')), row=1, col=2)
         
         fig.update_layout(height=400, showlegend=True, title_text="Histogram Karşılaştırması")
         st.plotly_chart(fig, use_container_width=True)
@@ -523,11 +538,8 @@ def load_image(uploaded_file):
     """Güvenli görüntü yükleme fonksiyonu"""
     try:
         if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            # RGBA görüntüleri RGB'ye çevir
-            if image.mode == 'RGBA':
-                image = image.convert('RGB')
-            return image
+            # Yükleme oturum deposunda bir kez çözülür, tekrar açılmaz
+            return get_image(store_upload(uploaded_file)).pil
         return None
     except Exception as e:
         st.error(f"Görüntü yüklenirken hata oluştu: {str(e)}")
@@ -588,17 +600,37 @@ def compare_images_detailed(original, processed):
     with col3:
         st.metric("SSIM", f"{ssim:.3f}", help="Structural Similarity Index (1'e yakın daha iyi)")
 
-def create_download_button(image, filename="processed_image.png"):
-    """İndirme butonu oluştur"""
-    buffer = io.BytesIO()
-    image.save(buffer, format='PNG')
+def _download_bytes(image, codec, quality, image_key=None):
+    """Encoded file of image, cached per (image, codec, quality) across reruns"""
+    if not codec.uses_quality:
+        quality = None
+    key = (image_key or image_digest(image), codec.name, quality)
+    with _downloads_lock:
+        data = _downloads.get(key)
+        if data is not None:
+            _downloads.move_to_end(key)
+            return data
+    data = codec.compress(image, quality)
+    with _downloads_lock:
+        _downloads[key] = data
+        while len(_downloads) > MAX_CACHED_DOWNLOADS:
+            _downloads.popitem(last=False)
+    return data
+
+def create_download_button(image, filename="processed_image.png", codec='png', quality=None, label=None,
+                           image_key=None):
+    """İndirme butonu oluştur (kodek kayıttan seçilir, dosya uzantısı kodeğe göre)"""
+    codec = get_codec(codec)
+    # Kodlanmış dosyanın tamamı bellekte tutulur; her rerun'da yeniden kodlanmaz
+    data = _download_bytes(image, codec, quality, image_key)
     
     st.download_button(
-        label="📥 İşlenmiş Görüntüyü İndir",
-        data=buffer.getvalue(),
-        file_name=filename,
-        mime="image/png",
-        help="İşlenmiş görüntüyü PNG formatında indir"
+        label=label or "📥 İşlenmiş Görüntüyü İndir",
+        data=data,
+        file_name=os.path.splitext(filename)[0] + codec.extension,
+        mime=codec.mime,
+        use_container_width=True,
+        help=f"İşlenmiş görüntüyü {codec.name.upper()} formatında indir"
     )
 
 def show_processing_info(filter_name, parameters=None):
@@ -636,7 +668,7 @@ def show_processing_info(filter_name, parameters=None):
             for tip in filter_tips[filter_name]:
                 st.write(f"• {tip}")
 
-def validate_image(image):
+def validate_image(image, memory_budget=None):
     """Görüntü doğrulaması"""
     if image is None:
         return False, "Görüntü yüklenemedi"
@@ -645,10 +677,13 @@ def validate_image(image):
     if image.width < 10 or image.height < 10:
         return False, "Görüntü çok küçük (minimum 10x10 piksel)"
     
-    # Maksimum boyut kontrolü
-    max_pixels = 4000 * 4000  # 16 megapiksel
-    if image.width * image.height > max_pixels:
-        return False, f"Görüntü çok büyük (maksimum {max_pixels:,} piksel)"
+    # Bellek bütçesi kontrolü (IMAGE_APP_MEMORY_MB); aşan görüntüler uygulamada değil,
+    # strips.py komut satırı aracıyla şerit şerit işlenir
+    channels = len(image.getbands())
+    if not fits_in_memory(image.width, image.height, channels, memory_budget):
+        budget = MEMORY_BUDGET if memory_budget is None else memory_budget
+        return False, (f"Görüntü bellek bütçesini aşıyor ({format_file_size(budget)}); büyük görüntüleri "
+                       "komut satırında işleyin: python strips.py girdi.tif cikti.png <filtre> [parametre=değer ...]")
     
     return True, "Görüntü geçerli"
 
@@ -656,14 +691,21 @@ def initialize_session_state():
     """Initialize all session state variables"""
     if 'language' not in st.session_state:
         st.session_state.language = 'tr'
-    if 'uploaded_file' not in st.session_state:
-        st.session_state.uploaded_file = None
+    if 'image_key' not in st.session_state:
+        st.session_state.image_key = None
+    if 'image_name' not in st.session_state:
+        st.session_state.image_name = None
     if 'selected_category' not in st.session_state:
         st.session_state.selected_category = None
     if 'selected_filter' not in st.session_state:
         st.session_state.selected_filter = None
     if 'processed_image' not in st.session_state:
         st.session_state.processed_image = None
+        # Sonucun içerik özeti (indirme önbelleği) ve üretildiği görüntünün anahtarı
+        st.session_state.processed_key = None
+        st.session_state.processed_source = None
+        st.session_state.processed_generation = 0
+        st.session_state.job_sources = {}
     if 'filter_params' not in st.session_state:
         st.session_state.filter_params = {}
 
@@ -673,10 +715,13 @@ def change_language(new_language):
         st.session_state.language = new_language
         # Store current state to preserve it
         st.session_state.previous_state = {
-            'uploaded_file': st.session_state.uploaded_file,
+            'image_key': st.session_state.image_key,
+            'image_name': st.session_state.image_name,
             'selected_category': st.session_state.selected_category,
             'selected_filter': st.session_state.selected_filter,
             'processed_image': st.session_state.processed_image,
+            'processed_key': st.session_state.processed_key,
+            'processed_source': st.session_state.processed_source,
             'filter_params': st.session_state.filter_params.copy() if st.session_state.filter_params else {}
         }
 
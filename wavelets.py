@@ -0,0 +1,239 @@
+"""
+Wavelet engine: in-place float32 lifting (haar, db4, bior2.2) with a cached coefficient pyramid
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+from arrays import to_array, like_input, to_uint8
+from result_cache import image_digest
+
+WAVELETS = ('haar', 'db4', 'bior2.2')
+MAX_LEVEL = 4
+MAX_CACHED_PYRAMIDS = 4
+
+SQRT2 = np.float32(np.sqrt(2.0))
+SQRT3 = np.float32(np.sqrt(3.0))
+
+_pyramids = OrderedDict()
+_pyramids_lock = threading.Lock()
+
+
+def _halves(view, axis):
+    """Even and odd sample views of view along axis (no copies)"""
+    moved = np.moveaxis(view, axis, 0)
+    return moved[0::2], moved[1::2]
+
+
+def _shifted(values, step):
+    """values[i - step] with periodic wrap, as a temporary"""
+    return np.roll(values, step, axis=0)
+
+
+def _haar(even, odd, inverse=False):
+    if not inverse:
+        odd -= even
+        even += odd * np.float32(0.5)
+        even *= SQRT2
+        odd /= SQRT2
+    else:
+        odd *= SQRT2
+        even /= SQRT2
+        even -= odd * np.float32(0.5)
+        odd += even
+
+
+def _db4(even, odd, inverse=False):
+    """Daubechies 4-tap filter as three lifting steps (Daubechies-Sweldens), periodic"""
+    predict = (SQRT3 - np.float32(2.0)) / np.float32(4.0)
+    if not inverse:
+        even += SQRT3 * odd
+        odd -= SQRT3 / np.float32(4.0) * even + predict * _shifted(even, 1)
+        even -= _shifted(odd, -1)
+        even *= (SQRT3 - np.float32(1.0)) / SQRT2
+        odd *= (SQRT3 + np.float32(1.0)) / SQRT2
+    else:
+        even /= (SQRT3 - np.float32(1.0)) / SQRT2
+        odd /= (SQRT3 + np.float32(1.0)) / SQRT2
+        even += _shifted(odd, -1)
+        odd += SQRT3 / np.float32(4.0) * even + predict * _shifted(even, 1)
+        even -= SQRT3 * odd
+
+
+def _cdf53(even, odd, inverse=False):
+    """bior2.2 (CDF 5/3) predict and update with symmetric extension"""
+    def predict(sign):
+        # x[n] = x[n - 2]: sağ kenarda son çift örnek tekrar kullanılır
+        neighbours = np.concatenate([even[1:], even[-1:]], axis=0)
+        np.add(odd, np.float32(-0.5 * sign) * (even + neighbours), out=odd)
+
+    def update(sign):
+        # x[-1] = x[1]: sol kenarda ilk tek örnek tekrar kullanılır
+        neighbours = np.concatenate([odd[:1], odd[:-1]], axis=0)
+        np.add(even, np.float32(0.25 * sign) * (odd + neighbours), out=even)
+
+    if not inverse:
+        predict(1)
+        update(1)
+        even *= SQRT2
+        odd /= SQRT2
+    else:
+        even /= SQRT2
+        odd *= SQRT2
+        update(-1)
+        predict(-1)
+
+
+LIFTING = {
+    'haar': _haar,
+    'db4': _db4,
+    'bior2.2': _cdf53,
+}
+
+
+class WaveletPyramid:
+    """Interleaved (in-place) lifting coefficients of one image and wavelet
+
+    The image is padded once to a multiple of 2^MAX_LEVEL and every level
+    lifts the strided view of the previous level's coarse samples, so the
+    coefficients of all levels share one float32 buffer: the level-l coarse
+    band is buffer[::2^l, ::2^l] and its details sit in the odd rows and
+    columns of buffer[::2^(l-1), ::2^(l-1)].
+    """
+
+    def __init__(self, array, wavelet):
+        if wavelet not in LIFTING:
+            raise ValueError(f"Unknown wavelet: {wavelet}")
+        self.wavelet = wavelet
+        self.shape = array.shape
+        self.dtype = array.dtype
+        block = 1 << MAX_LEVEL
+        height, width = array.shape[:2]
+        padding = [(0, -height % block), (0, -width % block)] + [(0, 0)] * (array.ndim - 2)
+        self.buffer = np.pad(array.astype(np.float32), padding, mode='edge')
+        self.levels = 0
+        # Önbellekteki tampon yerinde derinleşir; okumalar aynı kilidi tutar
+        self._lock = threading.RLock()
+
+    def _lift(self, level, inverse=False, buffer=None):
+        """Forward or inverse lifting of one level, rows then columns (in place)"""
+        step = 1 << (level - 1)
+        view = (self.buffer if buffer is None else buffer)[::step, ::step]
+        lift = LIFTING[self.wavelet]
+        for axis in ((1, 0) if inverse else (0, 1)):
+            lift(*_halves(view, axis), inverse=inverse)
+
+    def decompose(self, level):
+        """Extend the pyramid to level, lifting only the levels not done yet"""
+        level = int(np.clip(level, 1, MAX_LEVEL))
+        with self._lock:
+            while self.levels < level:
+                self.levels += 1
+                self._lift(self.levels)
+        return self
+
+    def coarse(self, level):
+        """Approximation band of level, rebuilt from the deeper cached levels if needed"""
+        step = 1 << level
+        with self._lock:
+            scratch = np.array(self.buffer[::step, ::step])
+            # Daha derin seviyeler yalnızca bu kaba bandın kopyası üzerinde geri alınır
+            for deeper in range(self.levels, level, -1):
+                self._lift(deeper - level, inverse=True, buffer=scratch)
+        return scratch
+
+    def details(self, level):
+        """(horizontal, vertical, diagonal) detail bands of level, as live views of the buffer"""
+        step = 1 << (level - 1)
+        view = self.buffer[::step, ::step]
+        return view[0::2, 1::2], view[1::2, 0::2], view[1::2, 1::2]
+
+    def bands(self):
+        """Copies of the coarsest approximation and of every detail band, deepest first"""
+        with self._lock:
+            result = [self.coarse(self.levels)]
+            for level in range(self.levels, 0, -1):
+                result.extend(np.array(band) for band in self.details(level))
+        return result
+
+    def set_bands(self, levels, bands):
+        """Load coefficients in the order bands() returns them (for decoders)"""
+        with self._lock:
+            self.levels = levels
+            self.buffer[::1 << levels, ::1 << levels] = bands[0]
+            views = [view for level in range(levels, 0, -1) for view in self.details(level)]
+            for view, band in zip(views, bands[1:]):
+                view[...] = band
+        return self
+
+    def reconstruct(self):
+        """Image rebuilt from the cached coefficients"""
+        with self._lock:
+            scratch = np.array(self.buffer)
+            levels = self.levels
+        for current in range(levels, 0, -1):
+            self._lift(current, inverse=True, buffer=scratch)
+        height, width = self.shape[:2]
+        result = scratch[:height, :width]
+        if self.dtype == np.uint8:
+            return to_uint8(result)
+        return result.astype(self.dtype)
+
+    def visualize(self, level):
+        """Coefficients in the usual Mallat layout, scaled to uint8
+
+        The approximation is shown at image brightness (divided by the 2^level
+        gain of the orthonormal 2D lifting); each detail band shows its
+        magnitude relative to the largest detail of its level.
+        """
+        canvas = np.zeros(self.buffer.shape, dtype=np.float32)
+        height, width = self.buffer.shape[:2]
+        with self._lock:
+            level = int(np.clip(level, 1, self.levels))
+            for current in range(1, level + 1):
+                h, w = height >> current, width >> current
+                horizontal, vertical, diagonal = (np.abs(band) for band in self.details(current))
+                peak = max(float(horizontal.max()), float(vertical.max()), float(diagonal.max()), 1e-6)
+                canvas[:h, w:2 * w] = horizontal * (255.0 / peak)
+                canvas[h:2 * h, :w] = vertical * (255.0 / peak)
+                canvas[h:2 * h, w:2 * w] = diagonal * (255.0 / peak)
+            h, w = height >> level, width >> level
+            canvas[:h, :w] = self.coarse(level) / np.float32(1 << level)
+        return to_uint8(canvas)
+
+
+def get_pyramid(image, wavelet='haar', level=1, image_key=None):
+    """Return the wavelet pyramid of image decomposed to at least level
+
+    Pyramids are cached per image and wavelet; asking for a deeper level
+    lifts only the missing levels on the cached buffer.
+    """
+    array = to_array(image)
+    if image_key is None:
+        image_key = image_digest(array)
+    key = (image_key, wavelet)
+    with _pyramids_lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None:
+            _pyramids.move_to_end(key)
+    if pyramid is None:
+        pyramid = WaveletPyramid(array, wavelet)
+        with _pyramids_lock:
+            pyramid = _pyramids.setdefault(key, pyramid)
+            while len(_pyramids) > MAX_CACHED_PYRAMIDS:
+                _pyramids.popitem(last=False)
+    return pyramid.decompose(level)
+
+
+def wavelet_transform(image, wavelet_type='haar', level=1, image_key=None):
+    """Multi-level 2D wavelet decomposition of a PIL image or ndarray, visualized"""
+    level = int(np.clip(level, 1, MAX_LEVEL))
+    pyramid = get_pyramid(image, wavelet_type, level, image_key)
+    return like_input(pyramid.visualize(level), image)
+
+
+def wavelet_reconstruct(image, wavelet_type='haar', level=1, image_key=None):
+    """Inverse transform of the cached pyramid (perfect reconstruction up to float32 rounding)"""
+    pyramid = get_pyramid(image, wavelet_type, level, image_key)
+    return like_input(pyramid.reconstruct(), image)
@@ -0,0 +1,79 @@
+"""
+Shared background worker pool for filter execution
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, CancelledError
+
+# Tüm oturumların paylaştığı iş parçacığı havuzu
+MAX_WORKERS = int(os.environ.get('IMAGE_APP_WORKERS', str(min(32, os.cpu_count() or 4))))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='filter')
+
+
+class StaleJob(Exception):
+    """Raised when a job was superseded by a newer submission"""
+
+
+class JobSlot:
+    """Per-session job slot; only the newest submission may publish a result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.future = None
+        self.last_result = None
+        self.last_generation = 0
+
+    def submit(self, func, *args, **kwargs):
+        """Submit func as the newest job and cancel the previous one if queued"""
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            previous = self.future
+            self.future = _executor.submit(self._run, generation, func, args, kwargs)
+        if previous is not None:
+            previous.cancel()
+        return generation, self.future
+
+    def _run(self, generation, func, args, kwargs):
+        if generation != self.generation:
+            # Başlamadan önce yerine yenisi gelmiş - hiç çalıştırma
+            raise StaleJob(generation)
+        result = func(*args, **kwargs)
+        with self._lock:
+            if generation != self.generation:
+                raise StaleJob(generation)
+            self.last_result = result
+            self.last_generation = generation
+        return result
+
+    def last(self):
+        """(generation, result) of the last job that published a result"""
+        with self._lock:
+            return self.last_generation, self.last_result
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def wait(self, future, poll_interval=0.1, on_poll=None):
+        """Wait for future, calling on_poll between polls
+
+        on_poll gives the caller a chance to abort the wait (a Streamlit
+        rerun interrupts the script at its next st.* call). Returns the
+        result, or raises StaleJob if the job was superseded.
+        """
+        while True:
+            try:
+                return future.result(timeout=poll_interval)
+            except CancelledError:
+                raise StaleJob(None)
+            except TimeoutError:
+                if on_poll is not None:
+                    on_poll()
+
+
+def get_executor():
+    """Return the shared worker pool"""
+    return _executor